@@ -13,8 +13,9 @@ if sys.platform == 'win32' and sys.version_info >= (3, 8):
         pass
 
 import streamlit as st
-from scraper import NotionScraper
+from scraper import create_scraper
 from converter import NotionToWordConverter
+from fetch_policy import FetchPolicy
 from playwright.sync_api import Error as PlaywrightError
 
 # 设置页面配置
@@ -34,8 +35,12 @@ st.markdown("""
 # 侧边栏配置
 with st.sidebar:
     st.header("设置")
+    backend = st.selectbox("抓取后端", ["selenium", "playwright"], help="playwright 在一个共享浏览器中为每个页面创建独立上下文，启动更快、占用更少")
     show_browser = st.checkbox("显示浏览器 (调试模式)", value=False, help="勾选后将弹出浏览器窗口，可观察抓取过程")
     timeout = st.number_input("超时时间 (毫秒)", min_value=5000, value=30000, step=5000, help="页面加载超时时间，网速慢时可适当增加")
+    retries = st.number_input("图片重试次数", min_value=0, value=3, step=1, help="图片下载失败后的最大重试次数")
+    hedge_percentile = st.slider("对冲请求分位数", min_value=0.0, max_value=0.99, value=0.95, step=0.01, help="等待响应头的时间超过首字节延迟的该分位数时发出重复请求，0 表示关闭")
+    document_budget = st.number_input("图片下载总时间预算 (秒)", min_value=0, value=0, step=10, help="0 表示不限制")
 
 # 主界面输入
 url = st.text_input("🔗 请输入 Notion 公开页面 URL", placeholder="https://www.notion.so/your-public-page")
@@ -55,7 +60,12 @@ if st.button("开始转换", type="primary", disabled=not url):
             progress_bar.progress(10)
             
             # 使用 session state 缓存爬取内容，避免重复爬取（可选，这里简化为每次转换都爬）
-            scraper = NotionScraper(headless=not show_browser)
+            fetch_policy = FetchPolicy(
+                retries=int(retries),
+                hedge_percentile=hedge_percentile,
+                document_budget=document_budget or None,
+            )
+            scraper = create_scraper(backend, headless=not show_browser, fetch_policy=fetch_policy)
             
             status_text.info(f"⏳ 正在加载页面: {url}...")
             progress_bar.progress(30)
@@ -68,7 +78,7 @@ if st.button("开始转换", type="primary", disabled=not url):
             
             # 2. 转换为 Word
             status_text.info("📄 正在生成 Word 文档...")
-            converter = NotionToWordConverter()
+            converter = NotionToWordConverter(fetch_policy=fetch_policy)
             
             # 使用 BytesIO 在内存中保存文件
             output_stream = io.BytesIO()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+网络请求策略基准测试
+启动一个按比例随机卡顿和返回 503 的本地桩服务器，分别用普通会话和 FetchPolicy
+顺序下载同一批资源，比较延迟分位数和失败数
+
+示例:
+  python bench_fetch.py
+  python bench_fetch.py --requests 300 --stall-rate 0.07 --stall 2 --error-rate 0.03
+"""
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from fetch_policy import FetchPolicy
+from replay import percentile
+
+
+class FlakyServer:
+    """按比例卡顿或返回 503 的本地桩服务器"""
+
+    def __init__(self, stall_rate: float, stall: float, error_rate: float, seed: int = 0):
+        """
+        Args:
+            stall_rate: 卡顿的请求比例
+            stall: 卡顿时长（秒）
+            error_rate: 返回 503 的请求比例
+            seed: 随机种子
+        """
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        host, port = self._server.server_address[:2]
+        self.base_url = f"http://{host}:{port}"
+
+    def start(self) -> 'FlakyServer':
+        threading.Thread(target=self._server.serve_forever, daemon=True, name='flaky-server').start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _draw(self) -> float:
+        with self._lock:
+            return self._random.random()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                roll = server._draw()
+                if roll < server.error_rate:
+                    self._reply(503, b'busy')
+                    return
+                if roll < server.error_rate + server.stall_rate:
+                    time.sleep(server.stall)
+                self._reply(200, b'x' * 2048)
+
+            def _reply(self, status: int, body: bytes):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/octet-stream')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def run(fetch, urls: list) -> dict:
+    """
+    顺序下载所有 URL
+
+    Returns:
+        延迟分位数、总耗时和失败数
+    """
+    latencies = []
+    failures = 0
+    started = time.monotonic()
+    for url in urls:
+        request_started = time.monotonic()
+        try:
+            ok = fetch(url).status_code == 200
+        except requests.RequestException:
+            ok = False
+        latencies.append(time.monotonic() - request_started)
+        failures += not ok
+    return {
+        'p50': percentile(latencies, 0.50),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'elapsed': time.monotonic() - started,
+        'failures': failures,
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='比较普通请求和 FetchPolicy 在不稳定服务器上的尾延迟')
+    parser.add_argument('--requests', type=int, default=300, help='每种方式的请求数（默认: 300）')
+    parser.add_argument('--stall-rate', type=float, default=0.07, help='卡顿的请求比例（默认: 0.07）')
+    parser.add_argument('--stall', type=float, default=2.0, help='卡顿时长（秒，默认: 2）')
+    parser.add_argument('--error-rate', type=float, default=0.03, help='返回 503 的请求比例（默认: 0.03）')
+    parser.add_argument('--hedge-percentile', type=float, default=0.95, help='对冲分位数（默认: 0.95）')
+    parser.add_argument('--hedge-max-delay', type=float, default=1.0, help='对冲最长等待时间（秒，默认: 1.0）')
+    parser.add_argument('--hedge-ratio', type=float, default=0.1, help='最多对冲的请求比例（默认: 0.1）')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子（默认: 0）')
+    parser.add_argument('--json', default=None, help='把结果保存为 JSON 文件')
+    args = parser.parse_args()
+
+    server = FlakyServer(args.stall_rate, args.stall, args.error_rate, seed=args.seed).start()
+    urls = [f"{server.base_url}/img/{i}.png" for i in range(args.requests)]
+    print(f"🧪 {args.requests} 个请求，卡顿 {args.stall_rate:.0%}（{args.stall}s），503 {args.error_rate:.0%}")
+
+    try:
+        session = requests.Session()
+        baseline = run(lambda url: session.get(url, timeout=10), urls)
+        policy = FetchPolicy(hedge_percentile=args.hedge_percentile, hedge_max_delay=args.hedge_max_delay,
+                             hedge_ratio=args.hedge_ratio)
+        hedged = run(policy.get, urls)
+    finally:
+        server.stop()
+
+    for name, result in (('普通会话', baseline), ('FetchPolicy', hedged)):
+        print(f"📊 {name:<12} p50 {result['p50']:.3f}s  p95 {result['p95']:.3f}s  p99 {result['p99']:.3f}s  "
+              f"总耗时 {result['elapsed']:.1f}s  失败 {result['failures']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'baseline': baseline, 'policy': hedged, 'options': vars(args)}, f, indent=2)
+
+    # p95 和 p99 延迟都没有改善时以非零状态退出，便于发现回归
+    if hedged['p95'] >= baseline['p95'] and hedged['p99'] >= baseline['p99']:
+        print("❌ FetchPolicy 没有改善尾延迟")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+大表格转换基准测试
+生成 2000 行的简单表格和数据库表格视图页面，转换后检查行数、表头和样式，并统计耗时
+
+示例:
+  python bench_tables.py
+  python bench_tables.py --rows 5000 --max-seconds 10
+"""
+import io
+import sys
+import time
+import argparse
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from converter import NotionToWordConverter
+
+
+HEADER = ['名称', '数值', '备注']
+
+
+def build_simple_table(rows: int) -> str:
+    """简单表格块（notion-table-block）"""
+    body = ''.join(f'<tr><td>行 {i}</td><td>{i * 3}</td><td>备注 {i}</td></tr>' for i in range(rows))
+    head = ''.join(f'<th>{name}</th>' for name in HEADER)
+    return (f'<div class="notion-table-block"><table><thead><tr>{head}</tr></thead>'
+            f'<tbody>{body}</tbody></table></div>')
+
+
+def build_table_view(rows: int) -> str:
+    """表格视图的数据库（div 组成的表头和数据行）"""
+    head = ''.join(f'<div class="notion-table-view-header-cell">{name}</div>' for name in HEADER)
+    body = ''.join(
+        f'<div class="notion-table-view-row"><div class="notion-table-view-cell">行 {i}</div>'
+        f'<div class="notion-table-view-cell">{i * 3}</div>'
+        f'<div class="notion-table-view-cell">备注 {i}</div></div>'
+        for i in range(rows)
+    )
+    return (f'<div class="notion-collection_view-block"><div class="notion-table-view">'
+            f'{head}{body}</div></div>')
+
+
+def build_page(block: str) -> str:
+    return ('<html><body><div class="notion-page-block"><h1>大表格</h1></div>'
+            f'<div class="notion-page-content">{block}</div></body></html>')
+
+
+def check(name: str, block: str, rows: int, max_seconds: float) -> list:
+    """
+    转换页面并检查结果
+
+    Returns:
+        发现的问题列表
+    """
+    output = io.BytesIO()
+    started = time.perf_counter()
+    NotionToWordConverter().convert(build_page(block), output)
+    elapsed = time.perf_counter() - started
+
+    problems = []
+    doc = Document(output)
+    if len(doc.tables) != 1:
+        return [f"{name}: 应有 1 张表格，实际 {len(doc.tables)} 张"]
+    table = doc.tables[0]
+    if len(table.rows) != rows + 1:
+        problems.append(f"{name}: 应有 {rows + 1} 行，实际 {len(table.rows)} 行")
+    if [cell.text for cell in table.rows[0].cells] != HEADER:
+        problems.append(f"{name}: 表头不正确")
+    if table.rows[0]._tr.trPr is None or table.rows[0]._tr.trPr.find(qn('w:tblHeader')) is None:
+        problems.append(f"{name}: 表头行没有设置跨页重复")
+    if table.style is None or table.style.name != 'Table Grid':
+        problems.append(f"{name}: 表格样式应为 Table Grid")
+    if elapsed > max_seconds:
+        problems.append(f"{name}: 耗时 {elapsed:.2f}s 超过 {max_seconds}s")
+
+    print(f"📊 {name:<10} {rows} 行  {elapsed:.2f}s")
+    return problems
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='大表格转换的正确性和耗时检查')
+    parser.add_argument('--rows', type=int, default=2000, help='数据行数（默认: 2000）')
+    parser.add_argument('--max-seconds', type=float, default=5.0, help='单个页面的耗时上限（秒，默认: 5）')
+    args = parser.parse_args()
+
+    problems = []
+    problems += check('简单表格', build_simple_table(args.rows), args.rows, args.max_seconds)
+    problems += check('数据库视图', build_table_view(args.rows), args.rows, args.max_seconds)
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ 全部通过")
+
+
+if __name__ == '__main__':
+    main()
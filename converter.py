@@ -4,28 +4,56 @@ HTML 解析和 Word 文档生成模块
 """
 import re
 import io
-import requests
+import copy
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from xml.sax.saxutils import escape
 from bs4 import BeautifulSoup, Tag
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
 from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 
+from fetch_policy import FetchPolicy
+
+
+# XML 1.0 不允许的控制字符，写入表格 XML 前需要剔除
+_INVALID_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
 
 class NotionToWordConverter:
     """Notion HTML 到 Word 文档转换器"""
     
-    def __init__(self):
-        """初始化转换器"""
-        self.doc = Document()
+    def __init__(self, fetch_policy: FetchPolicy = None, engine: 'ConverterEngine' = None):
+        """
+        初始化转换器
+        
+        Args:
+            fetch_policy: 图片下载的请求策略（重试、对冲、时间预算），默认使用 FetchPolicy()
+            engine: 共享模板和图片缓存的 ConverterEngine，默认使用进程内共享的引擎
+        """
+        if engine is None:
+            engine = ConverterEngine(fetch_policy) if fetch_policy else default_engine()
+        self.engine = engine
+        self.fetch_policy = engine.fetch_policy
+        self.doc = engine.new_document()
         self.image_count = 0
+        self.cached_image_count = 0
+        self.table_count = 0
+        self._deadline = None
+        self._used = False
     
-    def convert(self, html_content: str, output_filename):
+    def convert(self, html_content: str, output_filename, include_title: bool = True):
         """
         将 HTML 内容转换为 Word 文档
         
         Args:
             html_content: Notion 页面的 HTML 内容
             output_filename: 输出的 Word 文件名或文件对象
+            include_title: 是否在文档开头添加页面标题
             
         Raises:
             Exception: 转换失败
@@ -38,8 +66,19 @@ class NotionToWordConverter:
         if not content_div:
             raise Exception("无法找到 Notion 内容区域，可能页面未公开或加载失败")
         
+        # 同一个转换器再次使用时从干净的模板重新开始
+        if self._used:
+            self.doc = self.engine.new_document()
+            self.image_count = 0
+            self.cached_image_count = 0
+            self.table_count = 0
+        self._used = True
+        
+        # 整个文档的图片下载共享一个时间预算
+        self._deadline = self.fetch_policy.deadline()
+        
         # 提取页面标题
-        title = self._extract_title(soup)
+        title = self._extract_title(soup) if include_title else ""
         if title:
             self.doc.add_heading(title, level=0)
         
@@ -85,8 +124,12 @@ class NotionToWordConverter:
         classes = element.get('class', [])
         class_str = ' '.join(classes) if classes else ''
         
+        # 表格 / 数据库（表格视图）
+        if self._is_table_block(element, class_str):
+            self._add_table(element)
+        
         # 标题块
-        if element.name in ['h1', 'h2', 'h3'] or 'notion-header' in class_str:
+        elif element.name in ['h1', 'h2', 'h3'] or 'notion-header' in class_str:
             self._add_heading(element)
         
         # 段落块
@@ -204,15 +247,123 @@ class NotionToWordConverter:
                 # Base64 图片
                 return  # 暂不处理 Base64
             elif src.startswith('http'):
-                response = requests.get(src, timeout=10)
-                if response.status_code == 200:
-                    image_stream = io.BytesIO(response.content)
-                    self.doc.add_picture(image_stream, width=Inches(5))
+                data, cached = self.engine.fetch_image(src, deadline=self._deadline)
+                if data:
+                    self.doc.add_picture(io.BytesIO(data), width=Inches(5))
                     self.image_count += 1
+                    self.cached_image_count += cached
         except Exception as e:
             # 图片加载失败，添加说明文字
             self.doc.add_paragraph(f"[图片加载失败: {str(e)}]")
     
+    def _is_table_block(self, element: Tag, class_str: str) -> bool:
+        """判断元素是否为简单表格或表格视图的数据库"""
+        if element.name == 'table':
+            return True
+        if 'notion-table-block' in class_str:
+            return True
+        if 'notion-collection_view' in class_str or 'notion-table-view' in class_str:
+            # 看板、画廊等其他视图没有表格结构，交给通用逻辑处理
+            return bool(element.find('table') or element.select_one('.notion-table-view'))
+        return False
+    
+    def _extract_table_rows(self, element: Tag):
+        """
+        提取表格的行数据
+        
+        Returns:
+            (rows, header_rows): 单元格文本的二维列表，以及表头行数
+        """
+        table = element if element.name == 'table' else element.find('table')
+        if table:
+            rows = []
+            header_rows = 0
+            for tr in table.find_all('tr'):
+                cells = tr.find_all(['td', 'th'], recursive=False)
+                if not cells:
+                    continue
+                rows.append([cell.get_text(' ', strip=True) for cell in cells])
+                # 表头行连续出现在表格开头
+                if len(rows) == header_rows + 1 and (
+                        tr.find_parent('thead') or all(cell.name == 'th' for cell in cells)):
+                    header_rows += 1
+            return rows, header_rows
+        
+        # 数据库表格视图：由 div 组成的表头和数据行
+        view = element if 'notion-table-view' in element.get('class', []) \
+            else element.select_one('.notion-table-view')
+        if not view:
+            return [], 0
+        
+        rows = []
+        header = [cell.get_text(' ', strip=True)
+                  for cell in view.select('.notion-table-view-header-cell')]
+        if header:
+            rows.append(header)
+        for item in view.select('.notion-collection-item, .notion-table-view-row'):
+            cells = item.select('.notion-table-view-cell')
+            if cells:
+                rows.append([cell.get_text(' ', strip=True) for cell in cells])
+        return rows, 1 if header else 0
+    
+    def _add_table(self, element: Tag):
+        """
+        添加表格
+        
+        逐个单元格调用 python-docx 的 cell() 接口在大表上非常慢，
+        这里一次性生成整张表的 XML 再插入文档。
+        """
+        rows, header_rows = self._extract_table_rows(element)
+        if not rows:
+            return
+        
+        tbl = parse_xml(self._build_table_xml(rows, header_rows))
+        self.doc.element.body._insert_tbl(tbl)
+        self.table_count += 1
+    
+    def _build_table_xml(self, rows, header_rows: int = 0) -> str:
+        """
+        生成整张表格的 WordprocessingML
+        
+        Args:
+            rows: 单元格文本的二维列表，行长度不一致时自动补齐
+            header_rows: 开头的表头行数（加粗并在分页时重复）
+        """
+        col_count = max(len(row) for row in rows)
+        
+        # 按正文宽度平均分配列宽（单位: twip）
+        section = self.doc.sections[-1]
+        text_width = (section.page_width - section.left_margin - section.right_margin) // 635
+        col_width = max(text_width // col_count, 1)
+        
+        parts = [
+            f'<w:tbl {nsdecls("w")}>',
+            '<w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:w="0" w:type="auto"/>'
+            '<w:tblLook w:val="04A0" w:firstRow="1" w:lastRow="0" w:firstColumn="1"'
+            ' w:lastColumn="0" w:noHBand="0" w:noVBand="1"/></w:tblPr>',
+            '<w:tblGrid>',
+            f'<w:gridCol w:w="{col_width}"/>' * col_count,
+            '</w:tblGrid>',
+        ]
+        
+        cell_open = f'<w:tc><w:tcPr><w:tcW w:w="{col_width}" w:type="dxa"/></w:tcPr><w:p>'
+        empty_cell = cell_open + '</w:p></w:tc>'
+        for index, row in enumerate(rows):
+            is_header = index < header_rows
+            parts.append('<w:tr><w:trPr><w:tblHeader/></w:trPr>' if is_header else '<w:tr>')
+            run_open = '<w:r><w:rPr><w:b/></w:rPr>' if is_header else '<w:r>'
+            for text in row:
+                if text:
+                    text = escape(_INVALID_XML_CHARS.sub('', text))
+                    parts.append(f'{cell_open}{run_open}<w:t xml:space="preserve">{text}</w:t></w:r></w:p></w:tc>')
+                else:
+                    parts.append(empty_cell)
+            parts.append(empty_cell * (col_count - len(row)))
+            parts.append('</w:tr>')
+        
+        parts.append('</w:tbl>')
+        return ''.join(parts)
+    
     def _add_code_block(self, element: Tag):
         """添加代码块"""
         code_text = element.get_text(strip=True)
@@ -234,3 +385,189 @@ class NotionToWordConverter:
             return
         
         self.doc.add_paragraph(text, style='Quote')
+
+
+class ConversionResult:
+    """convert_many 中单个文档的转换结果"""
+    
+    def __init__(self, index: int, output=None, error: Exception = None, image_count: int = 0,
+                 cached_image_count: int = 0, table_count: int = 0, elapsed: float = 0.0):
+        """
+        Args:
+            index: 文档在输入序列中的位置
+            output: 生成的 Word 文档（BytesIO），失败时为 None
+            error: 转换失败时的异常
+            image_count: 插入的图片数
+            cached_image_count: 其中命中图片缓存的数量
+            table_count: 插入的表格数
+            elapsed: 转换耗时（秒）
+        """
+        self.index = index
+        self.output = output
+        self.error = error
+        self.image_count = image_count
+        self.cached_image_count = cached_image_count
+        self.table_count = table_count
+        self.elapsed = elapsed
+    
+    @property
+    def ok(self) -> bool:
+        """是否转换成功"""
+        return self.error is None
+
+
+class _ImageCache:
+    """按总字节数限制容量的线程安全 LRU 图片缓存"""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key: str):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+            return data
+    
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class ConverterEngine:
+    """
+    可复用、线程安全的转换引擎
+    
+    默认模板只解析一次，每个文档从模板深拷贝；HTTP 会话（FetchPolicy）和图片缓存
+    在所有文档和线程间共享，适合常驻服务和批量任务。
+    """
+    
+    def __init__(self, fetch_policy: FetchPolicy = None, max_workers: int = 4,
+                 image_cache_mb: int = 64):
+        """
+        初始化引擎
+        
+        Args:
+            fetch_policy: 图片下载的请求策略，默认使用 FetchPolicy()
+            max_workers: convert_many 的并发转换数
+            image_cache_mb: 图片缓存容量（MB），0 表示不缓存
+        """
+        self.fetch_policy = fetch_policy or FetchPolicy()
+        self.max_workers = max_workers
+        self.image_cache = _ImageCache(image_cache_mb * 1024 * 1024) if image_cache_mb else None
+        self._template = Document()
+        self._template_lock = threading.Lock()
+    
+    def new_document(self):
+        """从预解析的模板复制出一个新文档"""
+        with self._template_lock:
+            return copy.deepcopy(self._template)
+    
+    def fetch_image(self, src: str, deadline=None):
+        """
+        下载图片，优先使用缓存
+        
+        Returns:
+            (data, cached): 图片内容（非 200 响应时为 None）以及是否命中缓存
+        """
+        if self.image_cache:
+            data = self.image_cache.get(src)
+            if data is not None:
+                return data, True
+        
+        response = self.fetch_policy.get(src, deadline=deadline)
+        if response.status_code != 200:
+            return None, False
+        
+        data = response.content
+        if self.image_cache:
+            self.image_cache.put(src, data)
+        return data, False
+    
+    def convert(self, html_content: str, output_filename):
+        """
+        转换单个文档，参数同 NotionToWordConverter.convert
+        
+        Returns:
+            完成转换的 NotionToWordConverter，可读取 image_count 等统计
+        """
+        converter = NotionToWordConverter(engine=self)
+        converter.convert(html_content, output_filename)
+        return converter
+    
+    def convert_many(self, html_contents, max_workers: int = None):
+        """
+        并发转换多个文档，按完成顺序逐个返回结果
+        
+        Args:
+            html_contents: HTML 内容的可迭代对象，按需读取，不会一次性全部载入
+            max_workers: 并发转换数，默认使用引擎的 max_workers
+            
+        Yields:
+            ConversionResult，通过 index 对应输入顺序；单个文档失败不会中断其余文档
+        """
+        max_workers = max_workers or self.max_workers
+        source = iter(enumerate(html_contents))
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='convert') as executor:
+            pending = set()
+            
+            def submit_next():
+                for index, html_content in source:
+                    pending.add(executor.submit(self._convert_one, index, html_content))
+                    return
+            
+            # 在途任务数保持在并发数的两倍以内
+            for _ in range(max_workers * 2):
+                submit_next()
+            
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.remove(future)
+                    submit_next()
+                    yield future.result()
+    
+    def _convert_one(self, index: int, html_content: str) -> ConversionResult:
+        """转换单个文档并收集统计"""
+        started = time.perf_counter()
+        converter = NotionToWordConverter(engine=self)
+        output = io.BytesIO()
+        try:
+            converter.convert(html_content, output)
+        except Exception as e:
+            return ConversionResult(index, error=e, elapsed=time.perf_counter() - started)
+        output.seek(0)
+        return ConversionResult(
+            index,
+            output=output,
+            image_count=converter.image_count,
+            cached_image_count=converter.cached_image_count,
+            table_count=converter.table_count,
+            elapsed=time.perf_counter() - started,
+        )
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def default_engine() -> ConverterEngine:
+    """进程内共享的默认转换引擎"""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = ConverterEngine()
+        return _default_engine
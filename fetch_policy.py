@@ -0,0 +1,299 @@
+"""
+网络请求策略模块
+为图片下载和页面加载提供重试、退避、单主机并发限制、对冲请求和文档总时间预算
+"""
+import time
+import random
+import threading
+from collections import deque
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# 遇到这些状态码时视为暂时性失败并重试
+RETRY_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+# 对冲令牌的最大积累数，避免长时间无需对冲后突然大量重复请求
+_HEDGE_BURST = 5
+
+
+class FetchBudgetExceeded(Exception):
+    """文档的网络请求总时间预算已用完"""
+
+
+class Deadline:
+    """单个文档的时间预算"""
+
+    def __init__(self, seconds: float = None):
+        """
+        Args:
+            seconds: 预算时长（秒），None 表示不限制
+        """
+        self.expires = time.monotonic() + seconds if seconds else None
+
+    def remaining(self) -> float:
+        """剩余时间（秒），不限制时返回 None"""
+        if self.expires is None:
+            return None
+        return self.expires - time.monotonic()
+
+    def check(self):
+        """预算用完时抛出 FetchBudgetExceeded"""
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise FetchBudgetExceeded("文档网络请求时间预算已用完")
+
+
+class FetchPolicy:
+    """
+    网络请求策略
+
+    - 暂时性失败按带抖动的指数退避重试
+    - 每个主机的并发连接数（包括对冲请求和输掉竞争但尚未结束的请求）不超过 per_host_limit
+    - 首字节耗时超过历史首字节延迟的指定分位数（不超过 hedge_max_delay）后发出一个重复请求，
+      取先收到响应头的结果；响应体的下载时间不计入，大文件不会因为下载慢而被重复请求
+    - 对冲请求的比例受 hedge_ratio 限制
+    - 可为每个文档设置网络请求总时间预算
+    """
+
+    def __init__(self, retries: int = 3, page_retries: int = 1, timeout: float = 10,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 per_host_limit: int = 4, hedge_percentile: float = 0.95,
+                 hedge_min_samples: int = 20, hedge_max_delay: float = 1.0,
+                 hedge_ratio: float = 0.1, document_budget: float = None):
+        """
+        初始化请求策略
+
+        Args:
+            retries: 图片等资源请求失败后的最大重试次数
+            page_retries: 页面加载失败后的最大重试次数
+            timeout: 单次请求超时时间（秒）
+            backoff_base: 退避基准时间（秒），第 n 次重试最多等待 base * 2^n
+            backoff_max: 单次退避的最长等待时间（秒）
+            per_host_limit: 每个主机的最大并发连接数
+            hedge_percentile: 触发对冲请求的首字节延迟分位数（0~1），为 0 或 None 时不对冲
+            hedge_min_samples: 按分位数对冲前需要积累的延迟样本数，样本不足时按 hedge_max_delay 对冲
+            hedge_max_delay: 等待响应头的最长时间（秒），超过后发出对冲请求。慢请求占比超过
+                1 - 分位数时分位数会落在慢请求上，此上限保证对冲仍然生效；None 表示不限制
+            hedge_ratio: 最多对冲的请求比例（0~1）
+            document_budget: 每个文档的网络请求总时间预算（秒），None 表示不限制
+        """
+        self.retries = retries
+        self.page_retries = page_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.per_host_limit = per_host_limit
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_max_delay = hedge_max_delay
+        self.hedge_ratio = hedge_ratio
+        self.document_budget = document_budget
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=per_host_limit * 2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._latencies = deque(maxlen=200)
+        # 每个请求积累 hedge_ratio 个令牌，每次对冲消耗一个，最多积累 _HEDGE_BURST 个
+        self._hedge_tokens = 1.0
+        self._host_slots = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=per_host_limit * 4,
+                                            thread_name_prefix='fetch')
+
+    def deadline(self) -> Deadline:
+        """为一个新文档创建时间预算"""
+        return Deadline(self.document_budget)
+
+    def get(self, url: str, deadline: Deadline = None) -> requests.Response:
+        """
+        按策略下载资源
+
+        Args:
+            url: 资源 URL
+            deadline: 文档的时间预算
+
+        Returns:
+            最终的响应对象（非暂时性错误的状态码原样返回）
+
+        Raises:
+            FetchBudgetExceeded: 时间预算已用完
+            requests.RequestException: 重试后仍然失败
+        """
+        return self.request('GET', url, deadline=deadline)
+
+    def request(self, method: str, url: str, deadline: Deadline = None, **kwargs) -> requests.Response:
+        """
+        按策略发出任意请求，仅用于幂等的读取操作（对冲时可能重复发送）
+
+        Args:
+            method: HTTP 方法
+            url: 请求 URL
+            deadline: 时间预算
+            **kwargs: 传给 requests 的其他参数（如 json、headers）
+        """
+        return self._retry(lambda timeout: self._hedged_request(method, url, timeout, kwargs),
+                           self.retries, deadline)
+
+    def run(self, func, *args, deadline: Deadline = None, retry_if=None, **kwargs):
+        """
+        按退避策略重试任意操作（如整页加载）
+
+        Args:
+            func: 要执行的函数
+            deadline: 时间预算
+            retry_if: 判断异常是否值得重试的函数，默认全部重试
+        """
+        return self._retry(lambda timeout: func(*args, **kwargs),
+                           self.page_retries, deadline, retry_if)
+
+    def _retry(self, attempt, retries: int, deadline: Deadline = None, retry_if=None):
+        """带抖动指数退避的重试循环"""
+        for n in range(retries + 1):
+            if deadline:
+                deadline.check()
+            timeout = self._attempt_timeout(deadline)
+            try:
+                result = attempt(timeout)
+            except FetchBudgetExceeded:
+                raise
+            except Exception as e:
+                if n == retries or (retry_if and not retry_if(e)):
+                    raise
+            else:
+                if not (isinstance(result, requests.Response)
+                        and result.status_code in RETRY_STATUS_CODES) or n == retries:
+                    return result
+            self._sleep_backoff(n, deadline)
+
+    def _attempt_timeout(self, deadline: Deadline = None) -> float:
+        """单次请求的超时时间，不超过剩余预算"""
+        remaining = deadline.remaining() if deadline else None
+        if remaining is None:
+            return self.timeout
+        return max(min(self.timeout, remaining), 0.1)
+
+    def _sleep_backoff(self, attempt: int, deadline: Deadline = None):
+        """Full jitter 退避：在 [0, base * 2^n] 内随机等待"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        remaining = deadline.remaining() if deadline else None
+        if remaining is not None:
+            delay = min(delay, max(remaining, 0))
+        time.sleep(delay)
+
+    def _hedge_delay(self):
+        """根据历史延迟计算发出对冲请求前的等待时间"""
+        if not self.hedge_percentile:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                # 样本不足时按上限对冲
+                return self.hedge_max_delay
+            samples = sorted(self._latencies)
+        index = min(int(len(samples) * self.hedge_percentile), len(samples) - 1)
+        if self.hedge_max_delay is not None:
+            return min(samples[index], self.hedge_max_delay)
+        return samples[index]
+
+    def _hedged_request(self, method: str, url: str, timeout: float, kwargs: dict) -> requests.Response:
+        """
+        发出请求，超过首字节延迟阈值仍未收到响应头时再发一个重复请求
+
+        每个请求（包括对冲请求）各占一个主机并发名额，直到响应体读完或被关闭。
+        没有空闲名额或对冲比例已用完时不对冲，只等待原请求。
+        """
+        slot = self._host_slot(url)
+        slot.acquire()
+        with self._lock:
+            self._hedge_tokens = min(self._hedge_tokens + self.hedge_ratio, _HEDGE_BURST)
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is None or hedge_delay >= timeout:
+            return self._finish(slot, *self._attempt(method, url, timeout, kwargs, slot))
+
+        futures = {self._executor.submit(self._attempt, method, url, timeout, kwargs, slot)}
+        done, _ = wait(futures, timeout=hedge_delay)
+        if not done and self._take_hedge_token():
+            if slot.acquire(blocking=False):
+                futures.add(self._executor.submit(self._attempt, method, url, timeout, kwargs, slot))
+            else:
+                self._return_hedge_token()
+
+        error = None
+        pending = futures
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response, latency = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                # 另一个请求收到响应头后立即关闭并释放名额
+                for other in (done | pending) - {future}:
+                    other.add_done_callback(partial(self._discard, slot))
+                return self._finish(slot, response, latency)
+        raise error
+
+    def _attempt(self, method: str, url: str, timeout: float, kwargs: dict, slot):
+        """
+        发出一次请求，只等待响应头
+
+        Returns:
+            (响应对象, 首字节耗时)，响应体尚未读取，调用方负责读取或关闭并释放名额
+        """
+        started = time.monotonic()
+        try:
+            response = self.session.request(method, url, timeout=timeout, stream=True, **kwargs)
+        except BaseException:
+            slot.release()
+            raise
+        return response, time.monotonic() - started
+
+    def _finish(self, slot, response: requests.Response, latency: float) -> requests.Response:
+        """读取响应体、释放名额，并记录首字节延迟样本"""
+        try:
+            response.content
+        finally:
+            response.close()
+            slot.release()
+        # 只记录返回给调用方的那次请求的延迟，输给对冲请求的慢请求不计入样本，
+        # 否则慢请求多了以后分位数会等于慢请求的耗时，对冲就失效了
+        if response.status_code == 200:
+            with self._lock:
+                self._latencies.append(latency)
+        return response
+
+    @staticmethod
+    def _discard(slot, future):
+        """关闭输掉竞争的请求并释放名额（请求失败时 _attempt 已释放）"""
+        if future.exception() is None:
+            response, _ = future.result()
+            response.close()
+            slot.release()
+
+    def _take_hedge_token(self) -> bool:
+        """对冲比例未用完时消耗一个令牌"""
+        with self._lock:
+            if self._hedge_tokens >= 1:
+                self._hedge_tokens -= 1
+                return True
+            return False
+
+    def _return_hedge_token(self):
+        with self._lock:
+            self._hedge_tokens += 1
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """获取 URL 所属主机的并发信号量"""
+        host = urlparse(url).netloc
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+        return slot
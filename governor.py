@@ -0,0 +1,223 @@
+"""
+Chrome 资源管控模块
+限制进程内所有浏览器的总内存，并终止超出单页内存或 CPU 时间预算的渲染
+"""
+import sys
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # 没有 psutil 时只做准入控制，不采样
+    psutil = None
+
+
+# 低内存模式下追加的 Chrome 启动参数
+LOW_MEMORY_CHROME_ARGS = [
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-background-timer-throttling',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--disable-features=site-per-process,TranslateUI,IsolateOrigins',
+    '--renderer-process-limit=1',
+    '--process-per-site',
+    '--js-flags=--max-old-space-size=512',
+    '--mute-audio',
+    '--no-first-run',
+]
+
+
+class RenderBudgetExceeded(Exception):
+    """渲染超出资源预算并被终止"""
+
+
+class RenderWatch:
+    """单次渲染的资源记录"""
+
+    def __init__(self, label: str = ''):
+        self.label = label
+        self.pid = None
+        self.started = time.monotonic()
+        self.peak_memory_mb = 0.0
+        self.memory_mb = 0.0
+        self.cpu_seconds = 0.0
+        self.killed_reason = None
+
+    def as_dict(self) -> dict:
+        """转换为报告字典"""
+        return {
+            'label': self.label,
+            'peak_memory_mb': round(self.peak_memory_mb, 1),
+            'cpu_seconds': round(self.cpu_seconds, 2),
+            'wall_seconds': round(time.monotonic() - self.started, 2),
+            'killed_reason': self.killed_reason,
+        }
+
+
+class ChromeGovernor:
+    """
+    浏览器资源管控器
+
+    设置了单页内存预算时，每次渲染开始前按该预算预留额度，总额度用完时排队等待；
+    渲染期间后台线程定期采样 Chrome 进程树的内存和 CPU 时间，
+    超出已设置的单页预算或总预算时终止对应进程树并记录原因。
+
+    内存按 PSS（Linux）或 USS（其他平台）统计：Chrome 的多个进程共享大量内存，
+    逐进程累加 RSS 会把共享部分重复计算多次。
+    """
+
+    def __init__(self, total_memory_mb: int = None, page_memory_mb: int = None,
+                 page_cpu_seconds: float = None, sample_interval: float = 1.0):
+        """
+        初始化管控器，未设置的预算不做限制，只记录报告
+
+        Args:
+            total_memory_mb: 进程内所有浏览器的总内存预算（MB）
+            page_memory_mb: 单个页面渲染的内存预算（MB）
+            page_cpu_seconds: 单个页面渲染的 CPU 时间预算（秒）
+            sample_interval: 采样间隔（秒）
+        """
+        self.total_memory_mb = total_memory_mb
+        if page_memory_mb and total_memory_mb:
+            page_memory_mb = min(page_memory_mb, total_memory_mb)
+        self.page_memory_mb = page_memory_mb
+        self.page_cpu_seconds = page_cpu_seconds
+        self.sample_interval = sample_interval
+        self.reports = deque(maxlen=100)
+
+        self._reserved_mb = 0
+        self._watches = []
+        self._cond = threading.Condition()
+        self._monitor = None
+
+    @contextmanager
+    def render(self, label: str = ''):
+        """
+        申请一次渲染的资源额度
+
+        Args:
+            label: 渲染标识（通常为页面 URL），用于报告
+
+        Yields:
+            RenderWatch 对象，启动浏览器后需调用 attach() 绑定进程
+        """
+        # 只有同时设置了单页和总内存预算时才按额度排队
+        reserve_mb = self.page_memory_mb if self.page_memory_mb and self.total_memory_mb else 0
+        with self._cond:
+            while reserve_mb and self._reserved_mb + reserve_mb > self.total_memory_mb:
+                self._cond.wait()
+            self._reserved_mb += reserve_mb
+            watch = RenderWatch(label)
+            self._watches.append(watch)
+
+        try:
+            yield watch
+        finally:
+            with self._cond:
+                self._watches.remove(watch)
+                self._reserved_mb -= reserve_mb
+                self.reports.append(watch.as_dict())
+                self._cond.notify_all()
+
+    def attach(self, watch: RenderWatch, pid: int):
+        """
+        绑定渲染对应的根进程（如 chromedriver），开始采样
+
+        Args:
+            watch: render() 返回的记录对象
+            pid: 浏览器进程树的根进程 ID
+        """
+        watch.pid = pid
+        if psutil is None:
+            return
+        with self._cond:
+            if self._monitor is None or not self._monitor.is_alive():
+                self._monitor = threading.Thread(target=self._monitor_loop, daemon=True)
+                self._monitor.start()
+
+    def check(self, watch: RenderWatch):
+        """
+        如果渲染已因超出预算被终止，抛出 RenderBudgetExceeded
+        """
+        if watch.killed_reason:
+            raise RenderBudgetExceeded(f"页面渲染已被终止: {watch.killed_reason}")
+
+    def _monitor_loop(self):
+        """后台采样线程，没有待监控的渲染时退出"""
+        while True:
+            with self._cond:
+                watches = [w for w in self._watches if w.pid and not w.killed_reason]
+                if not self._watches:
+                    self._monitor = None
+                    return
+
+            for watch in watches:
+                self._sample(watch)
+                if self.page_memory_mb and watch.memory_mb > self.page_memory_mb:
+                    self._kill(watch, f"内存 {watch.memory_mb:.0f}MB 超出单页预算 {self.page_memory_mb}MB")
+                elif self.page_cpu_seconds and watch.cpu_seconds > self.page_cpu_seconds:
+                    self._kill(watch, f"CPU 时间 {watch.cpu_seconds:.1f}s 超出单页预算 {self.page_cpu_seconds}s")
+
+            # 总内存超出预算时终止占用最大的渲染
+            alive = [w for w in watches if not w.killed_reason]
+            total = sum(w.memory_mb for w in alive)
+            if alive and self.total_memory_mb and total > self.total_memory_mb:
+                largest = max(alive, key=lambda w: w.memory_mb)
+                self._kill(largest, f"浏览器总内存 {total:.0f}MB 超出预算 {self.total_memory_mb}MB")
+
+            time.sleep(self.sample_interval)
+
+    def _process_tree(self, pid: int):
+        """获取进程及其所有子进程"""
+        try:
+            root = psutil.Process(pid)
+            return [root] + root.children(recursive=True)
+        except psutil.Error:
+            return []
+
+    def _sample(self, watch: RenderWatch):
+        """采样进程树的内存和 CPU 时间"""
+        memory = 0
+        cpu = 0.0
+        for proc in self._process_tree(watch.pid):
+            try:
+                memory += _process_memory(proc)
+                times = proc.cpu_times()
+                cpu += times.user + times.system
+            except psutil.Error:
+                continue
+        watch.memory_mb = memory / (1024 * 1024)
+        watch.peak_memory_mb = max(watch.peak_memory_mb, watch.memory_mb)
+        # 进程退出后 CPU 时间无法再采样，保留已观测到的最大值
+        watch.cpu_seconds = max(watch.cpu_seconds, cpu)
+
+    def _kill(self, watch: RenderWatch, reason: str):
+        """终止渲染对应的整个进程树"""
+        watch.killed_reason = reason
+        procs = self._process_tree(watch.pid)
+        for proc in reversed(procs):
+            try:
+                proc.kill()
+            except psutil.Error:
+                continue
+        psutil.wait_procs(procs, timeout=5)
+
+
+def _process_memory(proc) -> int:
+    """
+    进程实际占用的内存（字节）
+
+    Linux 上使用 PSS（共享页按共享进程数平摊），其他平台使用 USS（进程独占的内存），
+    无权读取时退回到 RSS。
+    """
+    try:
+        info = proc.memory_full_info()
+    except psutil.AccessDenied:
+        return proc.memory_info().rss
+    if sys.platform.startswith('linux'):
+        return info.pss
+    return info.uss
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+web_app.py 压力测试工具
+启动 Flask 应用和一个提供示例 Notion 页面与图片的本地桩服务器，
+按配置的页面组合并发请求 /convert，报告延迟分位数、吞吐量、错误率和峰值内存
+
+示例:
+  python loadtest.py --concurrency 4 --requests 40
+  python loadtest.py --mix small=6,medium=3,large=1 --concurrency 8 --duration 120
+  python loadtest.py --fixtures ./pages --app-url http://127.0.0.1:5000
+"""
+import os
+import sys
+import json
+import time
+import random
+import struct
+import zlib
+import argparse
+import threading
+import subprocess
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+try:
+    import psutil
+except ImportError:  # 没有 psutil 时不统计内存
+    psutil = None
+
+from replay import percentile
+
+
+# 内置示例页面: 段落数、图片数、表格行数
+FIXTURE_SIZES = {
+    'small': (20, 1, 0),
+    'medium': (200, 5, 50),
+    'large': (2000, 20, 500),
+}
+
+
+def _png(seed: int) -> bytes:
+    """生成一张 1x1 的 PNG，颜色随 seed 变化"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    pixel = bytes([0, seed % 256, (seed * 7) % 256, (seed * 13) % 256])
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(pixel))
+            + chunk(b'IEND', b''))
+
+
+def build_fixture(kind: str, base_url: str) -> str:
+    """生成一个 Notion 结构的示例页面"""
+    paragraphs, images, table_rows = FIXTURE_SIZES[kind]
+    blocks = []
+    for i in range(paragraphs):
+        if i % 50 == 0:
+            blocks.append(f'<h2>第 {i // 50 + 1} 节</h2>')
+        blocks.append(f'<div class="notion-text-block">段落 {i}，<b>粗体</b> 和 <i>斜体</i> 文本。</div>')
+    for i in range(images):
+        blocks.append(f'<div class="notion-image-block"><img src="{base_url}/img/{kind}-{i}.png"></div>')
+    if table_rows:
+        rows = ''.join(f'<tr><td>行 {i}</td><td>{i * 3}</td><td>备注 {i}</td></tr>'
+                       for i in range(table_rows))
+        blocks.append(f'<div class="notion-table-block"><table><thead><tr><th>名称</th><th>数值</th>'
+                      f'<th>备注</th></tr></thead><tbody>{rows}</tbody></table></div>')
+    return ('<html><body><div class="notion-page-block"><h1>示例页面 ' + kind + '</h1></div>'
+            '<div class="notion-page-content">' + ''.join(blocks) + '</div></body></html>')
+
+
+class StubNotionServer:
+    """
+    本地桩服务器
+
+    /page/<名称> 返回示例页面，/img/<名称>.png 返回图片，所有响应可附加固定延迟。
+    """
+
+    def __init__(self, fixtures_dir: str = None, latency_ms: float = 0, port: int = 0):
+        """
+        Args:
+            fixtures_dir: 自定义页面目录（*.html，文件名即页面名称），默认使用内置示例页面
+            latency_ms: 每个响应的额外延迟（毫秒）
+            port: 监听端口，0 表示自动分配
+        """
+        self.latency_ms = latency_ms
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._make_handler())
+        self._server.daemon_threads = True
+        host, port = self._server.server_address[:2]
+        self.base_url = f"http://{host}:{port}"
+
+        if fixtures_dir:
+            self.pages = {path.stem: path.read_text(encoding='utf-8')
+                          for path in sorted(Path(fixtures_dir).glob('*.html'))}
+        else:
+            self.pages = {kind: build_fixture(kind, self.base_url) for kind in FIXTURE_SIZES}
+
+    def page_url(self, name: str) -> str:
+        return f"{self.base_url}/page/{name}"
+
+    def start(self) -> 'StubNotionServer':
+        threading.Thread(target=self._server.serve_forever, daemon=True, name='stub-notion').start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+                if self.path.startswith('/page/'):
+                    html = server.pages.get(self.path[len('/page/'):])
+                    self._reply(200 if html else 404, (html or '').encode('utf-8'),
+                                'text/html; charset=utf-8')
+                elif self.path.startswith('/img/'):
+                    self._reply(200, _png(zlib.crc32(self.path.encode())), 'image/png')
+                else:
+                    self._reply(404, b'', 'text/plain')
+
+            def _reply(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class MemorySampler:
+    """定期采样应用进程和其子进程（浏览器）的 RSS，记录峰值"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.peak_app_mb = 0.0
+        self.peak_browsers_mb = 0.0
+        self.peak_total_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name='memory-sampler')
+
+    def start(self) -> 'MemorySampler':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                app = psutil.Process(self.pid)
+                app_rss = app.memory_info().rss
+                children_rss = 0
+                for child in app.children(recursive=True):
+                    try:
+                        children_rss += child.memory_info().rss
+                    except psutil.Error:
+                        continue
+            except psutil.Error:
+                return
+            mb = 1024 * 1024
+            self.peak_app_mb = max(self.peak_app_mb, app_rss / mb)
+            self.peak_browsers_mb = max(self.peak_browsers_mb, children_rss / mb)
+            self.peak_total_mb = max(self.peak_total_mb, (app_rss + children_rss) / mb)
+            self._stop.wait(self.interval)
+
+
+def start_app(port: int, env: dict) -> subprocess.Popen:
+    """在子进程中启动 web_app，等待其可以响应请求"""
+    code = f"import web_app; web_app.app.run(host='127.0.0.1', port={port}, threaded=True)"
+    process = subprocess.Popen([sys.executable, '-c', code], cwd=os.path.dirname(os.path.abspath(__file__)),
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}/"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise Exception("web_app 启动失败")
+        try:
+            requests.get(url, timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise Exception("等待 web_app 启动超时")
+
+
+def parse_mix(text: str) -> dict:
+    """解析 small=6,medium=3 形式的页面组合"""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run_load(app_url: str, page_urls: dict, mix: dict, concurrency: int, total_requests: int = None,
+             duration: float = None, timeout: int = 60000, seed: int = 0) -> list:
+    """
+    以 concurrency 个并发用户请求 /convert，直到完成 total_requests 次或持续 duration 秒
+
+    Returns:
+        每个请求的 (页面名称, 延迟秒数, 是否成功) 列表
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    results = []
+    results_lock = threading.Lock()
+    issued = [0]
+    deadline = time.monotonic() + duration if duration else None
+
+    def next_page():
+        with rng_lock:
+            if total_requests is not None and issued[0] >= total_requests:
+                return None
+            if deadline and time.monotonic() >= deadline:
+                return None
+            issued[0] += 1
+            return rng.choices(names, weights)[0]
+
+    def user():
+        session = requests.Session()
+        while True:
+            name = next_page()
+            if name is None:
+                return
+            started = time.perf_counter()
+            try:
+                response = session.post(f"{app_url}/convert",
+                                        json={'url': page_urls[name], 'timeout': timeout},
+                                        timeout=timeout / 1000 * 4)
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            with results_lock:
+                results.append((name, time.perf_counter() - started, ok))
+
+    threads = [threading.Thread(target=user, name=f'user-{i}') for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    """统计延迟分位数、吞吐量和错误率"""
+    def stats(items):
+        latencies = [latency for _, latency, ok in items if ok]
+        summary = {
+            'requests': len(items),
+            'errors': sum(1 for _, _, ok in items if not ok),
+            'error_rate': round(sum(1 for _, _, ok in items if not ok) / len(items), 4) if items else 0,
+        }
+        if latencies:
+            summary.update(
+                p50=round(percentile(latencies, 0.50), 3),
+                p95=round(percentile(latencies, 0.95), 3),
+                p99=round(percentile(latencies, 0.99), 3),
+            )
+        return summary
+
+    report = stats(results)
+    report['elapsed'] = round(elapsed, 2)
+    report['throughput_per_sec'] = round(sum(1 for _, _, ok in results if ok) / elapsed, 3) if elapsed else 0
+    report['pages'] = {name: stats([r for r in results if r[0] == name])
+                       for name in sorted({name for name, _, _ in results})}
+    return report
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description='对 web_app.py 进行压力测试',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python loadtest.py --concurrency 4 --requests 40
+  python loadtest.py --mix small=6,medium=3,large=1 --concurrency 8 --duration 120
+  python loadtest.py --fixtures ./pages --app-url http://127.0.0.1:5000
+        """
+    )
+
+    parser.add_argument('--concurrency', type=int, default=4, help='并发用户数（默认: 4）')
+    parser.add_argument('--requests', type=int, default=None, help='总请求数（默认: 20，与 --duration 二选一）')
+    parser.add_argument('--duration', type=float, default=None, help='持续时间（秒）')
+    parser.add_argument('--mix', default=None,
+                        help='页面组合及权重，如 small=6,medium=3,large=1（默认: 所有页面等权重）')
+    parser.add_argument('--fixtures', default=None, help='自定义页面目录（*.html），默认使用内置示例页面')
+    parser.add_argument('--stub-latency', type=float, default=0, help='桩服务器每个响应的额外延迟（毫秒）')
+    parser.add_argument('--timeout', type=int, default=60000, help='传给 /convert 的页面超时（毫秒）')
+    parser.add_argument('--app-url', default=None, help='压测已运行的应用，不再启动新进程（不统计内存）')
+    parser.add_argument('--port', type=int, default=5055, help='启动应用时使用的端口（默认: 5055）')
+    parser.add_argument('--backend', choices=['selenium', 'playwright'], default=None,
+                        help='应用使用的抓取后端（设置 NOTION2WORD_BACKEND）')
+    parser.add_argument('--seed', type=int, default=0, help='页面组合的随机种子')
+    parser.add_argument('--json', default=None, help='把报告另存为 JSON 文件')
+
+    args = parser.parse_args()
+    if args.requests is None and args.duration is None:
+        args.requests = 20
+
+    stub = StubNotionServer(args.fixtures, args.stub_latency).start()
+    mix = parse_mix(args.mix) if args.mix else {name: 1 for name in stub.pages}
+    unknown = [name for name in mix if name not in stub.pages]
+    if unknown:
+        print(f"❌ 错误: 未知的页面 {', '.join(unknown)}，可用页面: {', '.join(stub.pages)}")
+        sys.exit(1)
+
+    process = None
+    sampler = None
+    app_url = args.app_url
+    if not app_url:
+        env = dict(os.environ)
+        if args.backend:
+            env['NOTION2WORD_BACKEND'] = args.backend
+        print("🚀 正在启动 web_app...")
+        process = start_app(args.port, env)
+        app_url = f"http://127.0.0.1:{args.port}"
+        if psutil is not None:
+            sampler = MemorySampler(process.pid).start()
+
+    print(f"⏳ 压测 {app_url}，并发 {args.concurrency}，页面组合 {mix}")
+    try:
+        started = time.perf_counter()
+        results = run_load(app_url, {name: stub.page_url(name) for name in mix}, mix,
+                           args.concurrency, args.requests, args.duration, args.timeout, args.seed)
+        report = summarize(results, time.perf_counter() - started)
+    finally:
+        if sampler:
+            sampler.stop()
+        if process:
+            # 连同可能残留的浏览器进程一起结束
+            children = psutil.Process(process.pid).children(recursive=True) if psutil else []
+            process.terminate()
+            process.wait(timeout=10)
+            for child in children:
+                try:
+                    child.kill()
+                except psutil.Error:
+                    pass
+        stub.stop()
+
+    report['concurrency'] = args.concurrency
+    if sampler:
+        report['peak_memory_mb'] = {
+            'app': round(sampler.peak_app_mb, 1),
+            'browsers': round(sampler.peak_browsers_mb, 1),
+            'total': round(sampler.peak_total_mb, 1),
+        }
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -16,8 +16,12 @@ if sys.platform == 'win32' and sys.version_info >= (3, 8):
     except Exception:
         pass
 
-from scraper import NotionScraper
+from scraper import create_scraper
 from converter import NotionToWordConverter
+from governor import ChromeGovernor
+from fetch_policy import FetchPolicy
+from sections import SectionedConverter
+from profiles import ProfileManager
 
 
 def main():
@@ -57,6 +61,109 @@ def main():
         help='页面加载超时时间（毫秒，默认: 30000）'
     )
     
+    parser.add_argument(
+        '--backend',
+        choices=['selenium', 'playwright'],
+        default='selenium',
+        help='抓取后端: selenium（每页一个浏览器）或 playwright（共享浏览器，默认: selenium）'
+    )
+    
+    parser.add_argument(
+        '--low-memory',
+        action='store_true',
+        help='使用低内存的 Chrome 启动参数'
+    )
+    
+    parser.add_argument(
+        '--max-page-memory',
+        type=int,
+        default=None,
+        help='单页渲染的内存上限（MB），超出则终止浏览器'
+    )
+    
+    parser.add_argument(
+        '--max-page-cpu',
+        type=float,
+        default=None,
+        help='单页渲染的 CPU 时间上限（秒），超出则终止浏览器'
+    )
+    
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=3,
+        help='图片下载失败后的最大重试次数（默认: 3）'
+    )
+    
+    parser.add_argument(
+        '--page-retries',
+        type=int,
+        default=1,
+        help='页面加载失败后的最大重试次数（默认: 1）'
+    )
+    
+    parser.add_argument(
+        '--per-host-limit',
+        type=int,
+        default=4,
+        help='每个主机的最大并发下载数（默认: 4）'
+    )
+    
+    parser.add_argument(
+        '--hedge-percentile',
+        type=float,
+        default=0.95,
+        help='下载耗时超过该延迟分位数时发出重复请求，0 表示关闭（默认: 0.95）'
+    )
+    
+    parser.add_argument(
+        '--hedge-max-delay',
+        type=float,
+        default=1.0,
+        help='等待响应头的最长时间，超过后发出重复请求（秒，默认: 1.0）'
+    )
+    
+    parser.add_argument(
+        '--hedge-ratio',
+        type=float,
+        default=0.1,
+        help='最多发出重复请求的请求比例（默认: 0.1）'
+    )
+    
+    parser.add_argument(
+        '--document-budget',
+        type=float,
+        default=None,
+        help='每个文档图片下载的总时间预算（秒），默认不限制'
+    )
+    
+    parser.add_argument(
+        '--profile-dir',
+        default=None,
+        help='持久化的 Chrome 配置目录，重复导出时复用 JS/字体/CSS 的磁盘缓存和 V8 代码缓存'
+    )
+    
+    parser.add_argument(
+        '--profile-size',
+        type=int,
+        default=1024,
+        help='持久化配置目录的总大小上限（MB，默认: 1024）'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='大页面按顶层标题分段，用指定数量的进程并行转换后合并（默认: 0，不分段）'
+    )
+    
+    parser.add_argument(
+        '--max-part-size',
+        type=float,
+        default=None,
+        help='单个输出文件的大致大小上限（MB），超出时拆分为多个文件'
+    )
+    
     args = parser.parse_args()
     
     # 验证 URL
@@ -64,26 +171,65 @@ def main():
         print("❌ 错误: 请提供有效的 URL")
         sys.exit(1)
     
+    # playwright 后端共享一个浏览器，不支持按页面的资源上限和持久化配置目录
+    if args.backend == 'playwright' and (args.max_page_memory or args.max_page_cpu or args.profile_dir):
+        print("❌ 错误: --max-page-memory、--max-page-cpu 和 --profile-dir 仅支持 selenium 后端")
+        sys.exit(1)
+    
     print(f"🚀 开始转换 Notion 页面...")
     print(f"📄 URL: {args.url}")
     
     try:
         # 步骤 1: 抓取页面
         print("\n⏳ 正在抓取页面内容...")
-        scraper = NotionScraper(headless=not args.show_browser)
+        fetch_options = dict(
+            retries=args.retries,
+            page_retries=args.page_retries,
+            per_host_limit=args.per_host_limit,
+            hedge_percentile=args.hedge_percentile,
+            hedge_max_delay=args.hedge_max_delay,
+            hedge_ratio=args.hedge_ratio,
+            document_budget=args.document_budget,
+        )
+        fetch_policy = FetchPolicy(**fetch_options)
+        
+        governor = None
+        if args.max_page_memory or args.max_page_cpu:
+            # 只启用命令行中指定的预算
+            governor = ChromeGovernor(
+                page_memory_mb=args.max_page_memory,
+                page_cpu_seconds=args.max_page_cpu,
+            )
+        scraper = create_scraper(
+            backend=args.backend,
+            headless=not args.show_browser,
+            low_memory=args.low_memory,
+            governor=governor,
+            fetch_policy=fetch_policy,
+            profiles=ProfileManager(args.profile_dir, max_size_mb=args.profile_size)
+            if args.profile_dir else None,
+        )
         html_content = scraper.scrape_page(args.url, timeout=args.timeout)
         print("✅ 页面抓取成功")
         
         # 步骤 2: 转换为 Word
         print("\n⏳ 正在生成 Word 文档...")
-        converter = NotionToWordConverter()
+        if args.workers or args.max_part_size:
+            converter = SectionedConverter(
+                max_workers=args.workers or None,
+                max_part_bytes=int(args.max_part_size * 1024 * 1024) if args.max_part_size else None,
+                fetch_options=fetch_options,
+            )
+        else:
+            converter = NotionToWordConverter(fetch_policy=fetch_policy)
         converter.convert(html_content, args.output)
         print(f"✅ Word 文档生成成功")
         
         # 显示结果
-        output_path = Path(args.output).absolute()
+        output_files = getattr(converter, 'output_files', None) or [args.output]
         print(f"\n🎉 转换完成!")
-        print(f"📁 文件位置: {output_path}")
+        for output_file in output_files:
+            print(f"📁 文件位置: {Path(output_file).absolute()}")
         
         if converter.image_count > 0:
             print(f"🖼️  已处理 {converter.image_count} 张图片")
@@ -0,0 +1,246 @@
+"""
+Playwright 页面爬虫模块
+在单个共享的 Chromium 中为每个页面创建独立的浏览器上下文，由一个事件循环并发抓取
+"""
+import sys
+import asyncio
+import threading
+
+from playwright.async_api import async_playwright
+
+from governor import LOW_MEMORY_CHROME_ARGS
+from fetch_policy import FetchPolicy
+
+
+class AsyncPlaywrightScraper:
+    """
+    异步 Playwright 爬虫
+
+    用法:
+        async with AsyncPlaywrightScraper() as scraper:
+            pages = await asyncio.gather(*(scraper.scrape_page(url) for url in urls))
+    """
+
+    def __init__(self, headless: bool = True, low_memory: bool = False, max_contexts: int = 16,
+                 record_har_path: str = None, replay=None):
+        """
+        初始化爬虫
+
+        Args:
+            headless: 是否使用无头模式
+            low_memory: 是否使用低内存的 Chrome 启动参数
+            max_contexts: 同时打开的浏览器上下文（页面）数量上限
+            record_har_path: 将页面的全部网络流量录制到该 HAR 文件（仅适合一次抓取一个页面）
+            replay: 可选的 replay.ReplayServer，所有请求改由本地回放服务器响应
+        """
+        self.headless = headless
+        self.low_memory = low_memory
+        self.max_contexts = max_contexts
+        self.record_har_path = record_har_path
+        self.replay = replay
+        self._playwright = None
+        self._browser = None
+        self._slots = None
+        self._start_lock = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """启动共享的 Chromium，并发调用时只启动一次，浏览器断开后再次调用会重新启动"""
+        # 锁和信号量需要在事件循环内创建
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._browser and self._browser.is_connected():
+                return
+            # 浏览器崩溃或断开后重新启动，驱动进程继续复用
+            self._browser = None
+            args = ['--no-sandbox', '--disable-dev-shm-usage', '--disable-gpu']
+            if self.low_memory:
+                args += LOW_MEMORY_CHROME_ARGS
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless, args=args)
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.max_contexts)
+
+    async def close(self):
+        """关闭浏览器"""
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def scrape_page(self, url: str, timeout: int = 30000) -> str:
+        """
+        抓取 Notion 页面的完整 HTML 内容
+
+        Args:
+            url: Notion 页面 URL
+            timeout: 页面加载超时时间（毫秒）
+
+        Returns:
+            页面的完整 HTML 内容
+
+        Raises:
+            Exception: 页面加载失败或无法访问
+        """
+        await self.start()
+        async with self._slots:
+            options = {'viewport': {'width': 1920, 'height': 1080}}
+            if self.record_har_path:
+                options.update(record_har_path=self.record_har_path, record_har_content='embed')
+            context = await self._browser.new_context(**options)
+            try:
+                if self.replay:
+                    await self.replay.attach(context)
+                page = await context.new_page()
+                page.set_default_timeout(max(60000, timeout))  # 至少60秒
+                await page.goto(url, timeout=timeout)
+
+                # 等待页面基本加载完成
+                try:
+                    await page.wait_for_selector('.notion-page-content', state='attached')
+                except Exception:
+                    # 如果找不到标准选择器，尝试等待任何 notion 相关元素
+                    await page.wait_for_selector('[class*="notion"]', state='attached')
+
+                # 额外等待确保内容渲染
+                await asyncio.sleep(3)
+
+                # 滚动到底部以触发懒加载
+                await self._scroll_to_bottom(page)
+
+                # 再等待一下让图片加载
+                await asyncio.sleep(3)
+
+                return await page.content()
+
+            except Exception as e:
+                raise Exception(f"抓取页面失败: {str(e)}")
+
+            finally:
+                await context.close()
+
+    async def _scroll_to_bottom(self, page, scroll_pause: float = 0.5):
+        """
+        滚动到页面底部以触发懒加载
+
+        Args:
+            page: Playwright Page 对象
+            scroll_pause: 每次滚动后的暂停时间（秒）
+        """
+        last_height = await page.evaluate("document.body.scrollHeight")
+
+        while True:
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            await asyncio.sleep(scroll_pause)
+
+            new_height = await page.evaluate("document.body.scrollHeight")
+            if new_height == last_height:
+                break
+
+            last_height = new_height
+
+
+class _BrowserHost:
+    """在后台线程的事件循环中运行一个共享的 AsyncPlaywrightScraper"""
+
+    def __init__(self, headless: bool, low_memory: bool, max_contexts: int):
+        # Windows 上的 SelectorEventLoop 不能创建子进程，Playwright 需要 ProactorEventLoop，
+        # 不能沿用入口脚本设置的 WindowsSelectorEventLoopPolicy
+        if sys.platform == 'win32':
+            self.loop = asyncio.ProactorEventLoop()
+        else:
+            self.loop = asyncio.new_event_loop()
+        self.scraper = AsyncPlaywrightScraper(headless, low_memory, max_contexts)
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True,
+                                       name='playwright-loop')
+        self.thread.start()
+
+    def run(self, coro):
+        """在共享事件循环中执行协程并等待结果"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+
+def _get_host(headless: bool, low_memory: bool, max_contexts: int) -> _BrowserHost:
+    """同一组启动参数在进程内共享一个浏览器"""
+    key = (headless, low_memory)
+    with _hosts_lock:
+        host = _hosts.get(key)
+        if host is None:
+            host = _hosts[key] = _BrowserHost(headless, low_memory, max_contexts)
+        return host
+
+
+class PlaywrightScraper:
+    """
+    Playwright 爬虫的同步接口，与 NotionScraper 用法一致
+
+    进程内所有实例共享同一个 Chromium 和事件循环，可在多个线程中同时调用。
+    """
+
+    def __init__(self, headless: bool = True, low_memory: bool = False,
+                 fetch_policy: FetchPolicy = None, max_contexts: int = 16):
+        """
+        初始化爬虫
+
+        Args:
+            headless: 是否使用无头模式
+            low_memory: 是否使用低内存的 Chrome 启动参数
+            fetch_policy: 页面加载失败时的重试策略，默认使用 FetchPolicy()
+            max_contexts: 共享浏览器中同时打开的页面数量上限（首次创建浏览器时生效）
+        """
+        self.headless = headless
+        self.low_memory = low_memory
+        self.fetch_policy = fetch_policy or FetchPolicy()
+        self._host = _get_host(headless, low_memory, max_contexts)
+
+    def scrape_page(self, url: str, timeout: int = 30000) -> str:
+        """
+        抓取 Notion 页面的完整 HTML 内容
+
+        Args:
+            url: Notion 页面 URL
+            timeout: 页面加载超时时间（毫秒）
+
+        Returns:
+            页面的完整 HTML 内容
+
+        Raises:
+            Exception: 页面加载失败或无法访问
+        """
+        return self.fetch_policy.run(self._scrape_once, url, timeout)
+
+    def scrape_many(self, urls, timeout: int = 30000) -> list:
+        """
+        在共享浏览器中并发抓取多个页面
+
+        Args:
+            urls: 页面 URL 列表
+            timeout: 单个页面的加载超时时间（毫秒）
+
+        Returns:
+            与 urls 顺序一致的列表，元素为 HTML 内容或抓取失败时的异常对象
+        """
+        async def gather():
+            return await asyncio.gather(
+                *(self._host.scraper.scrape_page(url, timeout) for url in urls),
+                return_exceptions=True,
+            )
+        return self._host.run(gather())
+
+    def _scrape_once(self, url: str, timeout: int) -> str:
+        """在共享浏览器中抓取一次页面"""
+        return self._host.run(self._host.scraper.scrape_page(url, timeout))
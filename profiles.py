@@ -0,0 +1,225 @@
+"""
+Chrome 持久化配置目录管理模块
+为每个并发抓取分配独立的持久化 user-data 目录（包含 HTTP 磁盘缓存和 V8 代码缓存），
+新目录从预热过的模板复制，整体大小受上限约束
+"""
+import os
+import sys
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# 复制配置目录时跳过的运行时文件
+_IGNORED_FILES = shutil.ignore_patterns('Singleton*', 'lockfile', 'Crashpad', 'BrowserMetrics*', '*.tmp')
+
+
+class ChromeProfile:
+    """一次租用的 Chrome 配置目录"""
+
+    def __init__(self, path: str, cache_size: int):
+        """
+        Args:
+            path: user-data 目录
+            cache_size: 磁盘缓存上限（字节）
+        """
+        self.path = path
+        self.cache_size = cache_size
+
+    def chrome_args(self) -> list:
+        """使用该配置目录所需的 Chrome 启动参数"""
+        return [
+            f'--user-data-dir={self.path}',
+            f'--disk-cache-size={self.cache_size}',
+            '--no-first-run',
+            '--no-default-browser-check',
+        ]
+
+
+class ProfileManager:
+    """
+    持久化配置目录管理器
+
+    目录结构:
+        <root>/template/     第一次成功抓取后的配置快照，已缓存 Notion 的 JS、字体和 CSS
+        <root>/workers/N/    每个并发抓取独占一个，首次使用时从 template 复制
+        <root>/workers/N.lock  租用锁，记录持有者进程 ID，跨进程有效
+
+    每次归还后检查总大小，超出上限时按最近使用时间删除空闲的 worker 目录。
+    """
+
+    def __init__(self, root: str, max_size_mb: int = 1024, max_workers: int = 8):
+        """
+        初始化管理器
+
+        Args:
+            root: 配置目录的根目录
+            max_size_mb: 所有配置目录的总大小上限（MB）
+            max_workers: 最多同时租用的配置目录数
+        """
+        self.root = os.path.abspath(root)
+        self.max_size = max_size_mb * 1024 * 1024
+        self.max_workers = max_workers
+        self.template_dir = os.path.join(self.root, 'template')
+        self.workers_dir = os.path.join(self.root, 'workers')
+        os.makedirs(self.workers_dir, exist_ok=True)
+
+    @contextmanager
+    def lease(self, wait_timeout: float = 300):
+        """
+        租用一个配置目录，期间其他抓取不会使用它
+
+        Args:
+            wait_timeout: 没有空闲目录时的最长等待时间（秒）
+
+        Yields:
+            ChromeProfile 对象
+        """
+        worker_dir, lock_path = self._acquire(wait_timeout)
+        try:
+            yield ChromeProfile(worker_dir, self.max_size // (self.max_workers + 1))
+            # 第一次成功抓取后的目录作为后续 worker 的模板
+            if not os.path.exists(self.template_dir):
+                self._promote(worker_dir)
+        finally:
+            os.utime(worker_dir)
+            os.remove(lock_path)
+            self._enforce_size_limit()
+
+    def _acquire(self, wait_timeout: float):
+        """获取一个空闲的 worker 目录及其锁文件"""
+        deadline = time.monotonic() + wait_timeout
+        while True:
+            for n in range(self.max_workers):
+                worker_dir = os.path.join(self.workers_dir, str(n))
+                lock_path = f"{worker_dir}.lock"
+                if self._try_lock(lock_path):
+                    if not os.path.exists(worker_dir):
+                        try:
+                            self._seed(worker_dir)
+                        except BaseException:
+                            # 锁文件记录的是本进程，不会被当作陈旧锁清除，失败时必须立即释放
+                            os.remove(lock_path)
+                            raise
+                    return worker_dir, lock_path
+            if time.monotonic() > deadline:
+                raise Exception("等待空闲的 Chrome 配置目录超时")
+            time.sleep(0.5)
+
+    def _try_lock(self, lock_path: str) -> bool:
+        """以独占方式创建锁文件，持有者进程已退出的陈旧锁会被清除"""
+        for _ in range(2):
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._is_stale(lock_path):
+                    return False
+                try:
+                    os.remove(lock_path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            return True
+        return False
+
+    def _is_stale(self, lock_path: str) -> bool:
+        """锁文件的持有者进程是否已不存在"""
+        try:
+            with open(lock_path) as f:
+                pid = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return False
+        if not pid:
+            return False
+        if psutil is not None:
+            return not psutil.pid_exists(pid)
+        if sys.platform == 'win32':
+            # Windows 上 os.kill 会终止进程，无法用来探测
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            return False
+        return False
+
+    def _seed(self, worker_dir: str):
+        """
+        从模板创建 worker 目录
+
+        先复制到临时目录再改名，失败时不会留下不完整的 worker 目录。
+        还没有模板，或复制期间模板被删除时创建空目录。
+        """
+        tmp_dir = os.path.join(self.root, f"seed.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            shutil.copytree(self.template_dir, tmp_dir, ignore=_IGNORED_FILES)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if os.path.exists(self.template_dir):
+                raise
+            os.makedirs(worker_dir)
+            return
+        os.rename(tmp_dir, worker_dir)
+
+    def _promote(self, worker_dir: str):
+        """把 worker 目录复制为模板，多个进程同时尝试时只有一个成功"""
+        tmp_dir = f"{self.template_dir}.{os.getpid()}.tmp"
+        try:
+            shutil.copytree(worker_dir, tmp_dir, ignore=_IGNORED_FILES)
+            os.rename(tmp_dir, self.template_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _enforce_size_limit(self):
+        """总大小超出上限时，按最近使用时间删除空闲的 worker 目录，最后才删除模板"""
+        total = _dir_size(self.root)
+        if total <= self.max_size:
+            return
+
+        idle = []
+        for name in os.listdir(self.workers_dir):
+            path = os.path.join(self.workers_dir, name)
+            if os.path.isdir(path) and not os.path.exists(f"{path}.lock"):
+                idle.append((os.path.getmtime(path), path))
+
+        for _, path in sorted(idle):
+            # 删除前先加锁，避免与刚开始租用它的抓取冲突
+            lock_path = f"{path}.lock"
+            if not self._try_lock(lock_path):
+                continue
+            size = _dir_size(path)
+            shutil.rmtree(path, ignore_errors=True)
+            os.remove(lock_path)
+            total -= size
+            if total <= self.max_size:
+                return
+
+        # 模板本身超出上限时删除，下一次成功抓取会重新生成。
+        # 先改名再删除，正在复制模板的抓取会看到模板已不存在，改为使用空目录
+        trash_dir = f"{self.template_dir}.{os.getpid()}.{threading.get_ident()}.trash"
+        try:
+            os.rename(self.template_dir, trash_dir)
+        except OSError:
+            return
+        shutil.rmtree(trash_dir, ignore_errors=True)
+
+
+def _dir_size(path: str) -> int:
+    """目录的总字节数"""
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                continue
+    return total
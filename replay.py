@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+录制与回放工具
+录制一次抓取的全部网络流量（HAR），在本地按可配置的延迟和带宽回放，
+用于离线、可重复地测量抓取和转换的吞吐量与延迟
+
+示例:
+  python replay.py record https://www.notion.so/your-page-id -o page.har
+  python replay.py serve page.har --latency 50 --bandwidth 2000
+  python replay.py bench page.har --runs 20 --concurrency 4 --latency 50
+"""
+import io
+import sys
+import json
+import time
+import base64
+import asyncio
+import argparse
+import threading
+from collections import defaultdict, deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import quote, unquote, urlsplit
+
+from requests.adapters import HTTPAdapter
+
+
+# 回放时不转发的响应头（HAR 中的内容已解压，长度需要重新计算）
+_SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection',
+                    'keep-alive'}
+
+# 回放服务器的 URL 前缀，后接原始 URL
+REPLAY_PREFIX = '/_replay/'
+
+
+class HarArchive:
+    """HAR 录制文件的请求索引"""
+
+    def __init__(self, path: str):
+        """
+        加载 HAR 文件
+
+        Args:
+            path: HAR 文件路径
+        """
+        with open(path, encoding='utf-8') as f:
+            har = json.load(f)
+
+        self.entries = har['log']['entries']
+        self._exact = defaultdict(deque)
+        self._by_url = defaultdict(deque)
+        self._by_path = defaultdict(deque)
+        self._lock = threading.Lock()
+
+        for entry in self.entries:
+            request = entry['request']
+            method, url = request['method'], request['url']
+            body = (request.get('postData') or {}).get('text', '')
+            self._exact[(method, url, body)].append(entry)
+            self._by_url[(method, url)].append(entry)
+            self._by_path[(method, self._strip_query(url))].append(entry)
+
+    @property
+    def page_url(self) -> str:
+        """录制的主页面 URL（第一个 HTML 文档请求）"""
+        for entry in self.entries:
+            mime = entry['response'].get('content', {}).get('mimeType', '')
+            if entry['request']['method'] == 'GET' and mime.startswith('text/html'):
+                return entry['request']['url']
+        return self.entries[0]['request']['url'] if self.entries else ''
+
+    def lookup(self, method: str, url: str, body: str = ''):
+        """
+        查找录制的响应：先精确匹配请求体，其次匹配 URL，最后忽略查询参数；
+        同一请求录制了多次时按顺序轮流返回
+
+        Returns:
+            HAR entry，未录制时返回 None
+        """
+        candidates = (
+            (self._exact, (method, url, body)),
+            (self._by_url, (method, url)),
+            (self._by_path, (method, self._strip_query(url))),
+        )
+        with self._lock:
+            for index, key in candidates:
+                queue = index.get(key)
+                if queue:
+                    queue.rotate(-1)
+                    return queue[-1]
+        return None
+
+    @staticmethod
+    def _strip_query(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}{parts.path}"
+
+
+class ReplayServer:
+    """
+    本地回放服务器
+
+    以 http://127.0.0.1:<port>/_replay/<原始 URL> 的形式提供录制的响应，
+    每个响应先等待固定延迟，再按限定带宽分块发送。
+    """
+
+    def __init__(self, archive: HarArchive, latency_ms: float = 0, bandwidth_kbps: float = 0,
+                 host: str = '127.0.0.1', port: int = 0):
+        """
+        初始化回放服务器
+
+        Args:
+            archive: 录制的 HAR 索引
+            latency_ms: 每个响应的额外延迟（毫秒）
+            bandwidth_kbps: 每个连接的带宽上限（KB/s），0 表示不限制
+            host: 监听地址
+            port: 监听端口，0 表示自动分配
+        """
+        self.archive = archive
+        self.latency_ms = latency_ms
+        self.bandwidth_kbps = bandwidth_kbps
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, url: str) -> str:
+        """原始 URL 在回放服务器上的地址"""
+        return f"{self.base_url}{REPLAY_PREFIX}{quote(url, safe='')}"
+
+    def start(self) -> 'ReplayServer':
+        """在后台线程中启动服务器"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True,
+                                        name='replay-server')
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """在当前线程中运行服务器"""
+        self._server.serve_forever()
+
+    def stop(self):
+        """停止服务器"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def install(self, session):
+        """
+        让 requests 会话（如 FetchPolicy.session）的所有请求改由回放服务器响应
+        """
+        adapter = _ReplayAdapter(self)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+    async def attach(self, context):
+        """
+        让 Playwright 浏览器上下文的所有请求改由回放服务器响应
+        """
+        async def handle(route):
+            request = route.request
+            try:
+                # 重定向交给浏览器处理，跳转后的请求同样会被拦截回放
+                response = await route.fetch(url=self.url_for(request.url), max_redirects=0)
+                await route.fulfill(response=response)
+            except Exception:
+                await route.abort()
+
+        await context.route('**/*', handle)
+
+    def _record(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                self._replay()
+
+            do_POST = do_PUT = do_DELETE = do_PATCH = do_HEAD = do_OPTIONS = do_GET
+
+            def _replay(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length).decode('utf-8', 'replace') if length else ''
+                url = unquote(self.path[len(REPLAY_PREFIX):]) \
+                    if self.path.startswith(REPLAY_PREFIX) else ''
+                entry = server.archive.lookup(self.command, url, body) if url else None
+
+                if server.latency_ms:
+                    time.sleep(server.latency_ms / 1000)
+
+                if entry is None:
+                    server._record(False)
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                server._record(True)
+                response = entry['response']
+                payload = _decode_content(response.get('content', {}))
+                status = response.get('status') or 200
+
+                self.send_response(status)
+                for header in response.get('headers', []):
+                    if header['name'].lower() not in _SKIPPED_HEADERS:
+                        self.send_header(header['name'], header['value'])
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self._send_shaped(payload)
+
+            def _send_shaped(self, payload: bytes):
+                """按带宽上限分块发送"""
+                if not server.bandwidth_kbps:
+                    self.wfile.write(payload)
+                    return
+                chunk = 16 * 1024
+                rate = server.bandwidth_kbps * 1024
+                for start in range(0, len(payload), chunk):
+                    part = payload[start:start + chunk]
+                    self.wfile.write(part)
+                    time.sleep(len(part) / rate)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class _ReplayAdapter(HTTPAdapter):
+    """把 requests 的请求改写到回放服务器"""
+
+    def __init__(self, server: ReplayServer):
+        super().__init__()
+        self.server = server
+
+    def send(self, request, **kwargs):
+        request.url = self.server.url_for(request.url)
+        return super().send(request, **kwargs)
+
+
+def _decode_content(content: dict) -> bytes:
+    """取出 HAR 中的响应体"""
+    text = content.get('text', '')
+    if content.get('encoding') == 'base64':
+        return base64.b64decode(text)
+    return text.encode('utf-8')
+
+
+def percentile(samples, fraction: float) -> float:
+    """样本的分位数（fraction 取 0~1）"""
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def record(url: str, har_path: str, timeout: int = 30000, headless: bool = True) -> str:
+    """
+    抓取页面并把全部网络流量录制为 HAR
+
+    Returns:
+        页面的 HTML 内容
+    """
+    from playwright_scraper import AsyncPlaywrightScraper
+
+    async with AsyncPlaywrightScraper(headless=headless, record_har_path=har_path) as scraper:
+        return await scraper.scrape_page(url, timeout)
+
+
+async def benchmark(server: ReplayServer, runs: int = 10, concurrency: int = 2,
+                    timeout: int = 30000) -> dict:
+    """
+    基于回放服务器测量端到端（抓取 + 转换）的吞吐量和延迟
+
+    Returns:
+        统计结果字典
+    """
+    from playwright_scraper import AsyncPlaywrightScraper
+    from converter import ConverterEngine
+    from fetch_policy import FetchPolicy
+
+    fetch_policy = FetchPolicy(hedge_percentile=0)
+    server.install(fetch_policy.session)
+    engine = ConverterEngine(fetch_policy=fetch_policy, image_cache_mb=0)
+    url = server.archive.page_url
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = []
+
+    async with AsyncPlaywrightScraper(max_contexts=concurrency, replay=server) as scraper:
+        async def one_run():
+            async with slots:
+                started = time.perf_counter()
+                try:
+                    html = await scraper.scrape_page(url, timeout)
+                    await loop.run_in_executor(None, engine.convert, html, io.BytesIO())
+                except Exception as e:
+                    errors.append(str(e))
+                    return
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_run() for _ in range(runs)))
+        elapsed = time.perf_counter() - started
+
+    stats = {
+        'runs': runs,
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'throughput_per_min': round(len(latencies) / elapsed * 60, 2),
+        'replay_hits': server.hits,
+        'replay_misses': server.misses,
+    }
+    if latencies:
+        stats.update(
+            p50=round(percentile(latencies, 0.50), 3),
+            p95=round(percentile(latencies, 0.95), 3),
+            p99=round(percentile(latencies, 0.99), 3),
+        )
+    return stats
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description='录制 Notion 页面的网络流量并在本地回放，用于离线性能测试',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python replay.py record https://www.notion.so/your-page-id -o page.har
+  python replay.py serve page.har --latency 50 --bandwidth 2000
+  python replay.py bench page.har --runs 20 --concurrency 4 --latency 50
+        """
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help='抓取页面并录制 HAR')
+    record_parser.add_argument('url', help='Notion 页面的公开 URL')
+    record_parser.add_argument('-o', '--output', default='notion_page.har', help='HAR 文件名')
+    record_parser.add_argument('--timeout', type=int, default=30000, help='页面加载超时时间（毫秒）')
+    record_parser.add_argument('--show-browser', action='store_true', help='显示浏览器窗口（调试用）')
+
+    for name, help_text in (('serve', '启动回放服务器'), ('bench', '基于回放测量抓取 + 转换性能')):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument('har', help='录制的 HAR 文件')
+        sub.add_argument('--latency', type=float, default=0, help='每个响应的额外延迟（毫秒）')
+        sub.add_argument('--bandwidth', type=float, default=0, help='每个连接的带宽上限（KB/s），0 表示不限制')
+        if name == 'serve':
+            sub.add_argument('--port', type=int, default=8765, help='监听端口（默认: 8765）')
+        else:
+            sub.add_argument('--runs', type=int, default=10, help='总运行次数（默认: 10）')
+            sub.add_argument('--concurrency', type=int, default=2, help='并发数（默认: 2）')
+            sub.add_argument('--timeout', type=int, default=30000, help='页面加载超时时间（毫秒）')
+
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        print(f"⏳ 正在录制: {args.url}")
+        asyncio.run(record(args.url, args.output, args.timeout, headless=not args.show_browser))
+        print(f"✅ 已保存: {args.output}")
+        return
+
+    archive = HarArchive(args.har)
+    print(f"📼 已加载 {len(archive.entries)} 条录制请求，主页面: {archive.page_url}")
+
+    if args.command == 'serve':
+        server = ReplayServer(archive, args.latency, args.bandwidth, port=args.port)
+        print(f"🌐 回放服务器: {server.base_url}{REPLAY_PREFIX}<原始 URL>")
+        print("按 Ctrl+C 停止服务器")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
+        return
+
+    server = ReplayServer(archive, args.latency, args.bandwidth).start()
+    try:
+        stats = asyncio.run(benchmark(server, args.runs, args.concurrency, args.timeout))
+    finally:
+        server.stop()
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+    if stats['errors']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@ Notion 页面爬虫模块
 使用 Selenium 抓取公开的 Notion 页面内容
 """
 import time
+from contextlib import nullcontext
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -11,18 +12,30 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
+from governor import LOW_MEMORY_CHROME_ARGS, RenderBudgetExceeded
+from fetch_policy import FetchPolicy
+
 
 class NotionScraper:
     """Notion 页面爬虫类"""
     
-    def __init__(self, headless: bool = True):
+    def __init__(self, headless: bool = True, low_memory: bool = False, governor=None,
+                 fetch_policy: FetchPolicy = None, profiles=None):
         """
         初始化爬虫
         
         Args:
             headless: 是否使用无头模式
+            low_memory: 是否使用低内存的 Chrome 启动参数
+            governor: 可选的 ChromeGovernor，用于限制浏览器内存和 CPU 时间
+            fetch_policy: 页面加载失败时的重试策略，默认使用 FetchPolicy()
+            profiles: 可选的 ProfileManager，使用持久化的配置目录复用磁盘缓存和 V8 代码缓存
         """
         self.headless = headless
+        self.low_memory = low_memory
+        self.governor = governor
+        self.fetch_policy = fetch_policy or FetchPolicy()
+        self.profiles = profiles
     
     def scrape_page(self, url: str, timeout: int = 30000) -> str:
         """
@@ -38,6 +51,14 @@ class NotionScraper:
         Raises:
             Exception: 页面加载失败或无法访问
         """
+        # 被资源管控器终止的页面重试也无济于事
+        return self.fetch_policy.run(
+            self._scrape_once, url, timeout,
+            retry_if=lambda e: not isinstance(e, RenderBudgetExceeded),
+        )
+    
+    def _scrape_once(self, url: str, timeout: int) -> str:
+        """启动一次浏览器抓取页面，参数同 scrape_page"""
         # 配置 Chrome 选项
         chrome_options = Options()
         if self.headless:
@@ -47,44 +68,77 @@ class NotionScraper:
         chrome_options.add_argument('--disable-gpu')
         chrome_options.add_argument('--window-size=1920,1080')
         
-        # 初始化 WebDriver
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.set_page_load_timeout(timeout / 1000)  # 转换为秒
+        if self.low_memory:
+            for arg in LOW_MEMORY_CHROME_ARGS:
+                chrome_options.add_argument(arg)
         
-        try:
-            # 访问页面
-            driver.get(url)
-            
-            # 增加等待时间并使用更宽松的条件
-            wait = WebDriverWait(driver, max(60, timeout / 1000))  # 至少60秒
+        lease = self.profiles.lease() if self.profiles else nullcontext()
+        render = self.governor.render(url) if self.governor else nullcontext()
+        with lease as profile, render as watch:
+            if profile:
+                for arg in profile.chrome_args():
+                    chrome_options.add_argument(arg)
             
-            # 等待页面基本加载完成
-            try:
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '.notion-page-content')))
-            except:
-                # 如果找不到标准选择器，尝试等待任何 notion 相关元素
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '[class*="notion"]')))
-            
-            # 额外等待确保内容渲染
-            time.sleep(3)
+            # 初始化 WebDriver
+            service = Service(ChromeDriverManager().install())
+            driver = webdriver.Chrome(service=service, options=chrome_options)
+            driver.set_page_load_timeout(timeout / 1000)  # 转换为秒
             
-            # 滚动到底部以触发懒加载
-            self._scroll_to_bottom(driver)
+            if watch:
+                # chromedriver 是 Chrome 进程树的根进程
+                self.governor.attach(watch, service.process.pid)
             
-            # 再等待一下让图片加载
-            time.sleep(3)
-            
-            # 获取完整 HTML
-            html_content = driver.page_source
+            try:
+                return self._load_page(driver, url, timeout)
+                
+            except Exception as e:
+                if watch:
+                    self.governor.check(watch)
+                raise Exception(f"抓取页面失败: {str(e)}")
             
-            return html_content
+            finally:
+                try:
+                    driver.quit()
+                except Exception:
+                    # 进程树可能已被资源管控器终止
+                    pass
+    
+    def _load_page(self, driver, url: str, timeout: int) -> str:
+        """
+        访问页面并等待内容渲染完成
+        
+        Args:
+            driver: Selenium WebDriver 对象
+            url: Notion 页面 URL
+            timeout: 页面加载超时时间（毫秒）
             
-        except Exception as e:
-            raise Exception(f"抓取页面失败: {str(e)}")
+        Returns:
+            页面的完整 HTML 内容
+        """
+        # 访问页面
+        driver.get(url)
+        
+        # 增加等待时间并使用更宽松的条件
+        wait = WebDriverWait(driver, max(60, timeout / 1000))  # 至少60秒
+        
+        # 等待页面基本加载完成
+        try:
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '.notion-page-content')))
+        except:
+            # 如果找不到标准选择器，尝试等待任何 notion 相关元素
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, '[class*="notion"]')))
+        
+        # 额外等待确保内容渲染
+        time.sleep(3)
         
-        finally:
-            driver.quit()
+        # 滚动到底部以触发懒加载
+        self._scroll_to_bottom(driver)
+        
+        # 再等待一下让图片加载
+        time.sleep(3)
+        
+        # 获取完整 HTML
+        return driver.page_source
     
     def _scroll_to_bottom(self, driver, scroll_pause: float = 0.5):
         """
@@ -111,3 +165,37 @@ class NotionScraper:
                 break
                 
             last_height = new_height
+
+
+def create_scraper(backend: str = 'selenium', headless: bool = True, low_memory: bool = False,
+                   governor=None, fetch_policy: FetchPolicy = None, profiles=None):
+    """
+    按配置创建爬虫
+    
+    Args:
+        backend: 抓取后端，'selenium'（每个页面一个浏览器进程）或
+                 'playwright'（所有页面共享一个 Chromium，每页一个独立上下文）
+        headless: 是否使用无头模式
+        low_memory: 是否使用低内存的 Chrome 启动参数
+        governor: ChromeGovernor，仅 selenium 后端按页面进程树管控
+        fetch_policy: 页面加载失败时的重试策略
+        profiles: ProfileManager，仅 selenium 后端使用持久化配置目录
+        
+    Returns:
+        具有 scrape_page(url, timeout) 方法的爬虫对象
+        
+    Raises:
+        ValueError: 未知的后端，或 playwright 后端传入了 governor / profiles
+    """
+    if backend == 'selenium':
+        return NotionScraper(headless=headless, low_memory=low_memory, governor=governor,
+                             fetch_policy=fetch_policy, profiles=profiles)
+    if backend == 'playwright':
+        # 所有页面共享一个浏览器进程树，无法按页面管控资源或分配独立的配置目录
+        if governor is not None or profiles is not None:
+            raise ValueError("playwright 后端不支持 governor 和 profiles，请使用 selenium 后端")
+        # 按需导入，只用 selenium 时不要求安装 playwright 浏览器
+        from playwright_scraper import PlaywrightScraper
+        return PlaywrightScraper(headless=headless, low_memory=low_memory,
+                                 fetch_policy=fetch_policy)
+    raise ValueError(f"未知的抓取后端: {backend}")
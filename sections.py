@@ -0,0 +1,218 @@
+"""
+大页面分段并行转换模块
+按顶层标题把页面拆成多个分段，在进程池中并行转换后合并为一个（或按大小拆分为多个）Word 文档
+"""
+import io
+import os
+import copy
+import time
+import zlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup, Tag
+from docx import Document
+from docx.oxml.ns import qn
+
+from converter import NotionToWordConverter
+from fetch_policy import FetchPolicy
+
+
+def _is_section_boundary(element: Tag) -> bool:
+    """顶层标题块作为分段边界"""
+    if element.name in ['h1', 'h2', 'h3']:
+        return True
+    return any(cls.endswith('header-block') for cls in element.get('class', []))
+
+
+def _convert_section(section_html: str, fetch_options: dict, expires_at: float = None):
+    """
+    在工作进程中转换一个分段
+
+    Args:
+        section_html: 分段的 HTML
+        fetch_options: FetchPolicy 的参数
+        expires_at: 整个文档时间预算的截止时刻（time.time()），None 表示不限制
+
+    Returns:
+        (docx 字节, 合并后的大致大小, 图片数, 命中缓存的图片数, 表格数)
+    """
+    options = dict(fetch_options)
+    if expires_at is not None:
+        # 所有分段共享文档的剩余预算，而不是各自重新计时
+        options['document_budget'] = max(expires_at - time.time(), 0.001)
+    converter = NotionToWordConverter(fetch_policy=FetchPolicy(**options))
+    output = io.BytesIO()
+    converter.convert(section_html, output, include_title=False)
+
+    # 样式、主题等模板内容合并后只出现一次，只按正文和图片估算分段在合并文档中的大小
+    estimate = len(zlib.compress(converter.doc.element.body.xml.encode('utf-8')))
+    for rel in converter.doc.part.rels.values():
+        if rel.reltype.endswith('/image'):
+            estimate += len(rel.target_part.blob)
+    return (output.getvalue(), estimate, converter.image_count, converter.cached_image_count,
+            converter.table_count)
+
+
+class SectionedConverter(NotionToWordConverter):
+    """
+    分段并行转换器，用法与 NotionToWordConverter 相同
+
+    顶层块数超过 parallel_threshold 时，按顶层标题把内容拆分为至少 min_section_blocks
+    个块的分段，在进程池中并行转换，再把各分段的正文和图片合并进同一个文档。
+    所有分段都基于同一个默认模板生成，样式和列表编号定义一致，合并后编号保持连续。
+    """
+
+    def __init__(self, max_workers: int = None, max_part_bytes: int = None,
+                 parallel_threshold: int = 500, min_section_blocks: int = 100,
+                 fetch_options: dict = None):
+        """
+        初始化转换器
+
+        Args:
+            max_workers: 进程池大小，默认为 CPU 核数
+            max_part_bytes: 单个输出文件的大致大小上限（字节），超出时拆分为多个文件，
+                            仅在输出为文件名时可用
+            parallel_threshold: 顶层块数超过该值时才分段并行
+            min_section_blocks: 每个分段至少包含的顶层块数
+            fetch_options: 传给各工作进程 FetchPolicy 的参数，其中 document_budget 为整个文档
+                           的预算，per_host_limit 为所有工作进程合计的上限
+        """
+        self.fetch_options = fetch_options or {}
+        super().__init__(fetch_policy=FetchPolicy(**self.fetch_options))
+        self.max_workers = max_workers
+        self.max_part_bytes = max_part_bytes
+        self.parallel_threshold = parallel_threshold
+        self.min_section_blocks = min_section_blocks
+        self.output_files = []
+
+    def convert(self, html_content: str, output_filename, include_title: bool = True):
+        """
+        将 HTML 内容转换为 Word 文档
+
+        Args:
+            html_content: Notion 页面的 HTML 内容
+            output_filename: 输出的 Word 文件名或文件对象
+            include_title: 是否在文档开头添加页面标题
+
+        Raises:
+            Exception: 转换失败
+        """
+        if self.max_part_bytes and not isinstance(output_filename, (str, Path)):
+            raise ValueError("按大小拆分输出时必须指定输出文件名")
+
+        soup = BeautifulSoup(html_content, 'html.parser')
+        content_div = soup.find('div', class_='notion-page-content')
+        if not content_div:
+            raise Exception("无法找到 Notion 内容区域，可能页面未公开或加载失败")
+
+        blocks = content_div.find_all(recursive=False)
+        if len(blocks) <= self.parallel_threshold and not self.max_part_bytes:
+            super().convert(html_content, output_filename, include_title)
+            self.output_files = [output_filename]
+            return
+
+        title = self._extract_title(soup) if include_title else ""
+        sections = [
+            f'<div class="notion-page-content">{"".join(str(block) for block in section)}</div>'
+            for section in self._split_blocks(blocks)
+        ]
+
+        workers = min(self.max_workers or os.cpu_count() or 1, len(sections))
+        fetch_options = dict(self.fetch_options)
+        # 各工作进程平分每个主机的并发连接上限，合计不超过单进程时的限制
+        # （工作进程数多于上限时每个进程至少保留 1 个）
+        fetch_options['per_host_limit'] = max(1, self.fetch_policy.per_host_limit // workers)
+        budget = self.fetch_policy.document_budget
+        expires_at = time.time() + budget if budget else None
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_convert_section, sections,
+                                        [fetch_options] * len(sections),
+                                        [expires_at] * len(sections)))
+
+        self.image_count = sum(result[2] for result in results)
+        self.cached_image_count = sum(result[3] for result in results)
+        self.table_count = sum(result[4] for result in results)
+
+        parts = self._group_parts([(data, estimate) for data, estimate, *_ in results])
+        if len(parts) == 1:
+            targets = [output_filename]
+        else:
+            path = Path(output_filename)
+            targets = [str(path.with_name(f"{path.stem}_{n}{path.suffix}"))
+                       for n in range(1, len(parts) + 1)]
+
+        for n, (part, target) in enumerate(zip(parts, targets), start=1):
+            self.doc = self.engine.new_document()
+            if title:
+                heading = title if len(parts) == 1 else f"{title}（第 {n} 部分）"
+                self.doc.add_heading(heading, level=0)
+            for data in part:
+                self._append_document(Document(io.BytesIO(data)))
+            self._renumber_drawings()
+            self.doc.save(target)
+
+        self.output_files = targets
+
+    def _split_blocks(self, blocks):
+        """在顶层标题处拆分，每个分段至少 min_section_blocks 个块"""
+        sections = []
+        current = []
+        for block in blocks:
+            if current and len(current) >= self.min_section_blocks and _is_section_boundary(block):
+                sections.append(current)
+                current = []
+            current.append(block)
+        if current:
+            sections.append(current)
+        return sections
+
+    def _group_parts(self, sections):
+        """
+        按大小上限把分段分组到不同的输出文件
+
+        Args:
+            sections: (docx 字节, 合并后的大致大小) 列表
+
+        Returns:
+            每个输出文件包含的分段 docx 字节列表
+        """
+        if not self.max_part_bytes:
+            return [[data for data, _ in sections]]
+        # 每个输出文件都包含一份模板（样式、主题等）
+        template = io.BytesIO()
+        self.engine.new_document().save(template)
+        base = len(template.getvalue())
+
+        parts = [[]]
+        size = base
+        for data, estimate in sections:
+            if parts[-1] and size + estimate > self.max_part_bytes:
+                parts.append([])
+                size = base
+            parts[-1].append(data)
+            size += estimate
+        return parts
+
+    def _append_document(self, source):
+        """把另一个文档的正文追加到当前文档，并迁移图片关系"""
+        body = self.doc.element.body
+        sect_pr = body.sectPr
+        for child in source.element.body.iterchildren():
+            if child.tag == qn('w:sectPr'):
+                continue
+            element = copy.deepcopy(child)
+            for blip in element.iter(qn('a:blip')):
+                image_part = source.part.related_parts[blip.get(qn('r:embed'))]
+                r_id, _ = self.doc.part.get_or_add_image(io.BytesIO(image_part.blob))
+                blip.set(qn('r:embed'), r_id)
+            if sect_pr is not None:
+                sect_pr.addprevious(element)
+            else:
+                body.append(element)
+
+    def _renumber_drawings(self):
+        """合并后图片的 docPr id 可能重复，重新编号"""
+        for shape_id, doc_pr in enumerate(self.doc.element.body.iter(qn('wp:docPr')), start=1):
+            doc_pr.set('id', str(shape_id))
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Notion 页面同步守护进程
+定期以轻量请求检查一批页面是否有更新，只重新导出发生变化的页面
+"""
+import os
+import re
+import sys
+import json
+import heapq
+import hashlib
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from scraper import create_scraper
+from converter import ConverterEngine, NotionToWordConverter
+from fetch_policy import FetchPolicy
+from profiles import ProfileManager
+
+
+_PAGE_ID = re.compile(r'([0-9a-f]{32})(?:[?#]|$)')
+
+
+class PageEntry:
+    """一个需要保持同步的页面"""
+
+    def __init__(self, url: str, output: str, interval: float):
+        """
+        Args:
+            url: Notion 页面 URL
+            output: 导出的 Word 文件路径
+            interval: 基准检查间隔（秒），数值越小优先级越高
+        """
+        self.url = url
+        self.output = output
+        self.interval = interval
+
+
+class TokenBucket:
+    """令牌桶限速器"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量
+        """
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，不足时等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+            time.sleep(wait_time)
+
+
+def load_pages(path: str, default_interval: float) -> list:
+    """
+    读取页面列表文件
+
+    每行格式: <URL> [输出文件] [检查间隔秒数]，# 开头为注释。
+    未指定输出文件时按页面 ID 命名。
+    """
+    pages = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split()
+            url = parts[0]
+            match = _PAGE_ID.search(url.replace('-', ''))
+            output = parts[1] if len(parts) > 1 else f"{match.group(1) if match else len(pages)}.docx"
+            interval = float(parts[2]) if len(parts) > 2 else default_interval
+            pages.append(PageEntry(url, output, interval))
+    return pages
+
+
+class SyncDaemon:
+    """
+    页面同步守护进程
+
+    - 按优先级队列调度检查：到期时间最早的页面先检查；连续未变化的页面检查间隔逐步加倍
+      （最多 max_backoff 倍），刚发生变化的页面恢复基准间隔
+    - 检查只发出轻量请求：优先读取页面的 last_edited_time，失败时退回到页面 HTML 的哈希
+    - 检查请求按令牌桶限速，导出由固定大小的线程池执行
+    - 状态保存在 JSON 文件中，重启后继续沿用
+    """
+
+    def __init__(self, pages, state_path: str, poll_rate: float = 1.0, export_workers: int = 1,
+                 max_backoff: int = 8, scraper_options: dict = None, fetch_policy: FetchPolicy = None):
+        """
+        初始化守护进程
+
+        Args:
+            pages: PageEntry 列表
+            state_path: 状态文件路径
+            poll_rate: 每秒最多发出的检查请求数
+            export_workers: 同时导出的页面数
+            max_backoff: 未变化页面检查间隔的最大倍数
+            scraper_options: 传给 create_scraper 的参数
+            fetch_policy: 检查请求和图片下载使用的请求策略
+        """
+        self.pages = {page.url: page for page in pages}
+        self.state_path = state_path
+        self.max_backoff = max_backoff
+        self.scraper_options = scraper_options or {}
+        self.fetch_policy = fetch_policy or FetchPolicy()
+        self.engine = ConverterEngine(fetch_policy=self.fetch_policy)
+        self.state = self._load_state()
+
+        self._bucket = TokenBucket(poll_rate)
+        self._exports = ThreadPoolExecutor(max_workers=export_workers, thread_name_prefix='export')
+        self._exporting = set()
+        self._state_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        now = time.time()
+        self._queue = []
+        for url in self.pages:
+            due = self.state.get(url, {}).get('next_check', now)
+            heapq.heappush(self._queue, (due, url))
+
+    def run(self, once: bool = False):
+        """
+        运行调度循环
+
+        Args:
+            once: 只把每个页面检查一遍后退出（适合由 cron 调用）
+        """
+        checked = set()
+        try:
+            while self._queue and not self._stop.is_set():
+                due, url = self._queue[0]
+                if not once:
+                    delay = due - time.time()
+                    if delay > 0:
+                        self._stop.wait(min(delay, 60))
+                        continue
+                heapq.heappop(self._queue)
+                if once and url in checked:
+                    continue
+                checked.add(url)
+
+                self._bucket.acquire()
+                self._check(self.pages[url])
+                if not once:
+                    next_check = self.state[url]['next_check']
+                    heapq.heappush(self._queue, (next_check, url))
+        finally:
+            self._exports.shutdown(wait=True)
+            self._save_state()
+
+    def stop(self):
+        """请求停止调度循环"""
+        self._stop.set()
+
+    def _check(self, page: PageEntry):
+        """检查页面是否变化，变化时提交导出"""
+        with self._state_lock:
+            entry = self.state.setdefault(page.url, {'backoff': 1})
+
+        try:
+            signature = self._signature(page.url)
+        except Exception as e:
+            # 检查失败时不做代价高的导出，按基准间隔稍后重试
+            print(f"⚠️  检查失败: {page.url}: {str(e)}")
+            with self._state_lock:
+                entry['last_checked'] = time.time()
+                entry['next_check'] = time.time() + page.interval
+            self._save_state()
+            return
+
+        with self._state_lock:
+            entry['last_checked'] = time.time()
+            changed = signature != entry.get('exported_signature') or not os.path.exists(page.output)
+            if changed:
+                entry['backoff'] = 1
+                if page.url not in self._exporting:
+                    self._exporting.add(page.url)
+                    self._exports.submit(self._export, page, signature)
+            else:
+                entry['backoff'] = min(entry.get('backoff', 1) * 2, self.max_backoff)
+            entry['next_check'] = time.time() + page.interval * entry['backoff']
+        self._save_state()
+
+    def _export(self, page: PageEntry, signature: str):
+        """重新导出页面"""
+        started = time.time()
+        try:
+            scraper = create_scraper(**self.scraper_options)
+            html_content = scraper.scrape_page(page.url)
+            converter = NotionToWordConverter(engine=self.engine)
+            tmp_path = f"{page.output}.tmp"
+            converter.convert(html_content, tmp_path)
+            os.replace(tmp_path, page.output)
+        except Exception as e:
+            print(f"❌ 导出失败: {page.url}: {str(e)}")
+            with self._state_lock:
+                self.state[page.url]['failures'] = self.state[page.url].get('failures', 0) + 1
+        else:
+            print(f"✅ 已导出: {page.url} -> {page.output} ({time.time() - started:.1f}s)")
+            with self._state_lock:
+                entry = self.state[page.url]
+                entry['failures'] = 0
+                entry['last_exported'] = time.time()
+                entry['exported_signature'] = signature
+        finally:
+            with self._state_lock:
+                self._exporting.discard(page.url)
+            self._save_state()
+
+    def _signature(self, url: str) -> str:
+        """
+        获取页面的变化签名
+
+        优先使用 Notion 接口返回的 last_edited_time，不可用时使用页面 HTML 的哈希
+        """
+        match = _PAGE_ID.search(url.replace('-', ''))
+        if match:
+            page_id = match.group(1)
+            block_id = '-'.join([page_id[:8], page_id[8:12], page_id[12:16],
+                                 page_id[16:20], page_id[20:]])
+            parts = urlsplit(url)
+            try:
+                response = self.fetch_policy.request(
+                    'POST', f"{parts.scheme}://{parts.netloc}/api/v3/syncRecordValues",
+                    json={'requests': [{'pointer': {'table': 'block', 'id': block_id}, 'version': -1}]},
+                )
+                if response.status_code == 200:
+                    value = response.json()['recordMap']['block'][block_id]['value']
+                    # 新版接口多包一层 value
+                    value = value.get('value', value)
+                    if value.get('last_edited_time'):
+                        return f"edited:{value['last_edited_time']}"
+            except (requests.RequestException, KeyError, TypeError, ValueError):
+                # 接口不可用时退回到页面哈希
+                pass
+
+        response = self.fetch_policy.get(url)
+        response.raise_for_status()
+        return f"sha256:{hashlib.sha256(response.content).hexdigest()}"
+
+    def _load_state(self) -> dict:
+        """读取状态文件"""
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_state(self):
+        """原子地写入状态文件"""
+        with self._state_lock:
+            data = json.dumps(self.state, ensure_ascii=False, indent=2)
+            tmp_path = f"{self.state_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.state_path)
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description='持续同步一批 Notion 页面，只重新导出有变化的页面',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+页面列表文件每行格式: <URL> [输出文件] [检查间隔秒数]
+
+示例:
+  python sync.py pages.txt
+  python sync.py pages.txt --state sync_state.json --interval 1800 --poll-rate 2
+  python sync.py pages.txt --once
+        """
+    )
+
+    parser.add_argument('pages', help='页面列表文件')
+    parser.add_argument('--state', default='sync_state.json', help='状态文件（默认: sync_state.json）')
+    parser.add_argument('--interval', type=float, default=3600, help='默认检查间隔（秒，默认: 3600）')
+    parser.add_argument('--poll-rate', type=float, default=1.0, help='每秒最多检查的页面数（默认: 1）')
+    parser.add_argument('--export-workers', type=int, default=1, help='同时导出的页面数（默认: 1）')
+    parser.add_argument('--max-backoff', type=int, default=8, help='未变化页面检查间隔的最大倍数（默认: 8）')
+    parser.add_argument('--backend', choices=['selenium', 'playwright'], default='selenium',
+                        help='抓取后端（默认: selenium）')
+    parser.add_argument('--profile-dir', default=None,
+                        help='持久化的 Chrome 配置目录，导出时复用磁盘缓存和 V8 代码缓存')
+    parser.add_argument('--once', action='store_true', help='每个页面检查一遍后退出')
+
+    args = parser.parse_args()
+
+    if args.backend == 'playwright' and args.profile_dir:
+        print("❌ 错误: --profile-dir 仅支持 selenium 后端")
+        sys.exit(1)
+
+    pages = load_pages(args.pages, args.interval)
+    if not pages:
+        print("❌ 错误: 页面列表为空")
+        sys.exit(1)
+
+    print(f"🔄 同步 {len(pages)} 个页面，状态文件: {args.state}")
+    daemon = SyncDaemon(
+        pages,
+        args.state,
+        poll_rate=args.poll_rate,
+        export_workers=args.export_workers,
+        max_backoff=args.max_backoff,
+        scraper_options={
+            'backend': args.backend,
+            'profiles': ProfileManager(args.profile_dir, max_workers=args.export_workers)
+            if args.profile_dir else None,
+        },
+    )
+    try:
+        daemon.run(once=args.once)
+    except KeyboardInterrupt:
+        daemon.stop()
+        print("\n👋 已停止")
+
+
+if __name__ == '__main__':
+    main()
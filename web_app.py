@@ -12,11 +12,60 @@ if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 from flask import Flask, render_template_string, request, send_file, jsonify
-from scraper import NotionScraper
-from converter import NotionToWordConverter
+from scraper import create_scraper
+from converter import NotionToWordConverter, ConverterEngine
+from governor import ChromeGovernor
+from fetch_policy import FetchPolicy
+from profiles import ProfileManager
 
 app = Flask(__name__)
 
+# 抓取后端: selenium（每页一个浏览器）或 playwright（所有请求共享一个浏览器）
+BACKEND = os.environ.get('NOTION2WORD_BACKEND', 'selenium')
+LOW_MEMORY = os.environ.get('NOTION2WORD_LOW_MEMORY', '') == '1'
+
+if BACKEND == 'playwright':
+    # 共享浏览器的进程树无法按页面管控资源，也不能为每个页面分配独立的配置目录
+    governor = None
+    profiles = None
+    ignored = [name for name in ('NOTION2WORD_TOTAL_MEMORY_MB', 'NOTION2WORD_PAGE_MEMORY_MB',
+                                 'NOTION2WORD_PAGE_CPU_SECONDS', 'NOTION2WORD_PROFILE_DIR')
+               if os.environ.get(name)]
+    if ignored:
+        print(f"⚠️  playwright 后端不支持以下设置，已忽略: {', '.join(ignored)}")
+else:
+    # 所有请求共享的浏览器资源管控器，默认只记录 /stats 报告，
+    # 设置对应的环境变量后才会按预算排队或终止渲染
+    governor = ChromeGovernor(
+        total_memory_mb=int(os.environ['NOTION2WORD_TOTAL_MEMORY_MB'])
+        if os.environ.get('NOTION2WORD_TOTAL_MEMORY_MB') else None,
+        page_memory_mb=int(os.environ['NOTION2WORD_PAGE_MEMORY_MB'])
+        if os.environ.get('NOTION2WORD_PAGE_MEMORY_MB') else None,
+        page_cpu_seconds=float(os.environ['NOTION2WORD_PAGE_CPU_SECONDS'])
+        if os.environ.get('NOTION2WORD_PAGE_CPU_SECONDS') else None,
+    )
+
+    # 持久化的 Chrome 配置目录（跨请求复用磁盘缓存和 V8 代码缓存），未设置时每次使用临时配置
+    profiles = ProfileManager(
+        os.environ['NOTION2WORD_PROFILE_DIR'],
+        max_size_mb=int(os.environ.get('NOTION2WORD_PROFILE_SIZE_MB', 1024)),
+    ) if os.environ.get('NOTION2WORD_PROFILE_DIR') else None
+
+# 所有请求共享的网络请求策略，对冲请求依赖跨请求积累的延迟样本
+fetch_policy = FetchPolicy(
+    retries=int(os.environ.get('NOTION2WORD_RETRIES', 3)),
+    page_retries=int(os.environ.get('NOTION2WORD_PAGE_RETRIES', 1)),
+    per_host_limit=int(os.environ.get('NOTION2WORD_PER_HOST_LIMIT', 4)),
+    hedge_percentile=float(os.environ.get('NOTION2WORD_HEDGE_PERCENTILE', 0.95)),
+    hedge_max_delay=float(os.environ.get('NOTION2WORD_HEDGE_MAX_DELAY', 1.0)),
+    hedge_ratio=float(os.environ.get('NOTION2WORD_HEDGE_RATIO', 0.1)),
+    document_budget=float(os.environ['NOTION2WORD_DOCUMENT_BUDGET'])
+    if os.environ.get('NOTION2WORD_DOCUMENT_BUDGET') else None,
+)
+
+# 所有请求共享的转换引擎（模板只解析一次，图片缓存跨请求复用）
+engine = ConverterEngine(fetch_policy=fetch_policy)
+
 HTML_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="zh-CN">
@@ -268,6 +317,11 @@ HTML_TEMPLATE = """
 def index():
     return render_template_string(HTML_TEMPLATE)
 
+@app.route('/stats')
+def stats():
+    """最近的浏览器渲染资源报告"""
+    return jsonify({'backend': BACKEND, 'renders': list(governor.reports) if governor else []})
+
 @app.route('/convert', methods=['POST'])
 def convert():
     try:
@@ -280,11 +334,12 @@ def convert():
             return jsonify({'error': '请提供 Notion 页面 URL'}), 400
         
         # 抓取页面
-        scraper = NotionScraper(headless=not show_browser)
+        scraper = create_scraper(BACKEND, headless=not show_browser, low_memory=LOW_MEMORY,
+                                 governor=governor, fetch_policy=fetch_policy, profiles=profiles)
         html_content = scraper.scrape_page(url, timeout=timeout)
         
         # 转换为 Word
-        converter = NotionToWordConverter()
+        converter = NotionToWordConverter(engine=engine)
         output_stream = io.BytesIO()
         converter.convert(html_content, output_stream)
         output_stream.seek(0)